@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Collections written by the indexers in indexer/src
+COLLECTIONS = ["adventurers", "battles", "beasts", "discoveries", "items", "scores"]
+
+# How often to check each collection for newly indexed blocks
+POLL_INTERVAL = 1
+
+# Heights older than this are not trusted to version cache entries
+MAX_HEIGHT_AGE = 30
+
+
+class BlockTracker:
+    """Tracks the latest block indexed into each collection.
+
+    The indexers stamp every document version with `_cursor.from`, so the
+    highest value per collection moves as new blocks land. It stays put
+    while the pending block is rewritten, or when a reorg lands back on
+    the same height, so each collection's head also includes its newest
+    `_id`: every version written gets a new one, and reorgs delete the
+    newest. `version()` turns those heads into a cache key component.
+    """
+
+    def __init__(self, db, collections=COLLECTIONS):
+        self._db = db
+        self._collections = collections
+        self._last_poll = None
+        self.heads = {}
+
+    async def _head(self, collection):
+        latest, newest = await asyncio.gather(
+            self._db[collection].find_one(
+                {}, {"_cursor.from": 1}, sort=[("_cursor.from", -1)]
+            ),
+            self._db[collection].find_one({}, {"_id": 1}, sort=[("_id", -1)]),
+        )
+        if latest is None or newest is None:
+            return "0"
+        return f"{latest['_cursor']['from']}-{newest['_id']}"
+
+    async def poll(self):
+        heads = await asyncio.gather(
+            *[self._head(collection) for collection in self._collections]
+        )
+        self.heads = dict(zip(self._collections, heads))
+        self._last_poll = time.monotonic()
+
+    def version(self, collections):
+        # No version while heights are unknown or outdated
+        if self._last_poll is None:
+            return None
+        if time.monotonic() - self._last_poll > MAX_HEIGHT_AGE:
+            return None
+        return ".".join(self.heads.get(c, "0") for c in collections)
+
+    async def run(self, interval=POLL_INTERVAL):
+        while True:
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Failed to poll indexed block heights")
+            await asyncio.sleep(interval)
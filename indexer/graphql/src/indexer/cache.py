@@ -0,0 +1,583 @@
+import asyncio
+import copy
+import dataclasses
+import hashlib
+import json
+import logging
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from operator import attrgetter
+
+from strawberry.dataloader import DataLoader
+
+# Compact binary serialization and faster compression. Both are declared
+# dependencies; JSON and zlib only stand in where they fail to import
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# How long a replica may hold the recompute lock for a key
+LOCK_TIMEOUT = 10
+
+# How often replicas waiting on another replica's recompute poll for the result
+LOCK_POLL_INTERVAL = 0.05
+
+# How long past its freshness an entry may still be served while it refreshes
+STALE_TTL = 300
+
+# Freshness of entries versioned by indexed block height; they are
+# superseded as soon as new blocks land, so this only bounds their lifetime
+VERSIONED_TTL = 600
+
+# Bounds on the decoded results each process keeps in front of Redis
+LOCAL_MAX_ENTRIES = 10_000
+LOCAL_MAX_BYTES = 64 * 1024 * 1024
+
+# Seconds a process serves its own copy of an entry before checking Redis
+# again. Entries keyed by block height only change when refreshed with the
+# same data, so this mostly bounds unversioned ones
+LOCAL_MAX_AGE = 5
+
+# Per-namespace overrides of LOCAL_MAX_AGE; 0 keeps a namespace out
+LOCAL_NAMESPACE_MAX_AGE = {
+    # Small and requested by every client
+    "count_adventurers_with_zero_health": 30,
+    "count_adventurers_with_positive_health": 30,
+    "count_total_adventurers": 30,
+    "count_total_discoveries_and_battles": 30,
+    # Large merged pages, rarely requested twice
+    "discoveries_and_battles": 0,
+}
+
+# Result of a flight that computed nothing, either a refresh left to
+# another replica or a computation whose caller was cancelled; whoever was
+# waiting on it takes over
+SKIPPED = object()
+
+# Result of a lookup that found nothing usable
+MISSING = object()
+
+# Cached payloads start with a header of three bytes: the format version,
+# the serializer and the compression used for the rest
+PAYLOAD_VERSION = 1
+SERIALIZER_JSON = 0
+SERIALIZER_MSGPACK = 1
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+
+# Payloads are compressed from this many bytes
+COMPRESSION_THRESHOLD = 1024
+
+# Compression contexts are reused; they are only used from the event loop
+if zstandard is not None:
+    zstd_compressor = zstandard.ZstdCompressor(level=3)
+    zstd_decompressor = zstandard.ZstdDecompressor()
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by key namespace and result (local, fresh, stale or miss).",
+    ("namespace", "result"),
+)
+LOCAL_CACHE_ENTRIES = Gauge("local_cache_entries", "Decoded results held in process.")
+LOCAL_CACHE_BYTES = Gauge(
+    "local_cache_bytes", "Encoded size of the results held in process."
+)
+REDIS_ROUND_TRIPS = Histogram(
+    "cache_redis_round_trips",
+    "Redis round-trips made by the cache per GraphQL request.",
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+
+# Deletes the lock only if it is still held by the caller
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def canonicalize(value):
+    # $in and $nin match regardless of the order of their operands
+    if isinstance(value, dict):
+        return {
+            str(k): (
+                sorted(v, key=repr)
+                if k in ("$in", "$nin") and isinstance(v, list)
+                else canonicalize(v)
+            )
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(v) for v in value]
+    return value
+
+
+def make_cache_key(namespace, **params):
+    """Compact, canonical cache key for a query.
+
+    Callers pass the compiled Mongo query rather than the GraphQL inputs,
+    so unset and defaulted input fields never reach the key. Parameters are
+    serialized with sorted keys and hashed, giving logically identical
+    queries one fixed-size key.
+    """
+    serialized = json.dumps(
+        canonicalize(params), sort_keys=True, separators=(",", ":"), default=str
+    )
+    digest = hashlib.blake2b(serialized.encode(), digest_size=16).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class CodecError(Exception):
+    pass
+
+
+def serialize(value):
+    """Versioned binary encoding of plain values (lists, dicts, scalars)."""
+    if msgpack is not None:
+        serializer = SERIALIZER_MSGPACK
+        data = msgpack.packb(value, use_bin_type=True)
+    else:
+        serializer = SERIALIZER_JSON
+        data = json.dumps(value, separators=(",", ":")).encode()
+
+    compression = COMPRESSION_NONE
+    if len(data) >= COMPRESSION_THRESHOLD:
+        if zstandard is not None:
+            compression = COMPRESSION_ZSTD
+            data = zstd_compressor.compress(data)
+        else:
+            compression = COMPRESSION_ZLIB
+            data = zlib.compress(data, 1)
+
+    return bytes((PAYLOAD_VERSION, serializer, compression)) + data
+
+
+def deserialize(payload):
+    # Payloads written in an unknown or unavailable format raise CodecError
+    if len(payload) < 3 or payload[0] != PAYLOAD_VERSION:
+        raise CodecError("Unsupported payload version")
+    serializer, compression, data = payload[1], payload[2], payload[3:]
+
+    if compression == COMPRESSION_ZSTD and zstandard is not None:
+        data = zstd_decompressor.decompress(data)
+    elif compression == COMPRESSION_ZLIB:
+        data = zlib.decompress(data)
+    elif compression != COMPRESSION_NONE:
+        raise CodecError(f"Unsupported compression {compression}")
+
+    if serializer == SERIALIZER_MSGPACK and msgpack is not None:
+        return msgpack.unpackb(data, raw=False)
+    if serializer == SERIALIZER_JSON:
+        return json.loads(data)
+    raise CodecError(f"Unsupported serializer {serializer}")
+
+
+class Codec:
+    """Base class of cache codecs.
+
+    Subclasses `pack` results into plain values and `unpack` them back;
+    every codec shares the same versioned binary serialization.
+    """
+
+    def pack(self, value):
+        return value
+
+    def unpack(self, value):
+        return value
+
+    def encode(self, value):
+        return serialize(self.pack(value))
+
+    def decode(self, data):
+        return self.unpack(deserialize(data))
+
+
+class ObjectListCodec(Codec):
+    """Lists of strawberry objects, stored as one row of values per object.
+
+    Field names are stored once per payload. Rows written for the current
+    fields of `cls` are loaded straight into new instances; others go
+    through `from_mongo`.
+
+    Loading skips the dataclass `__init__`, which for strawberry types
+    only assigns each field its argument: a matching row supplies every
+    field, so defaults never apply. Classes defining `__post_init__` are
+    constructed normally.
+    """
+
+    def __init__(self, cls):
+        self.cls = cls
+        # Fields with resolvers are computed, not stored
+        self.fields = tuple(f.name for f in dataclasses.fields(cls) if f.init)
+        self._row = attrgetter(*self.fields)
+        self._direct = not hasattr(cls, "__post_init__")
+
+    def pack(self, items):
+        return [self.fields, [self._row(item) for item in items]]
+
+    def unpack(self, value):
+        fields, rows = value
+        cls = self.cls
+        if tuple(fields) != self.fields:
+            return [cls.from_mongo(dict(zip(fields, row))) for row in rows]
+        if not self._direct:
+            return [cls(**dict(zip(self.fields, row))) for row in rows]
+
+        # Fill the instance dict with the class's own, interned, field names
+        items = []
+        for row in rows:
+            item = object.__new__(cls)
+            item.__dict__.update(zip(self.fields, row))
+            items.append(item)
+        return items
+
+
+class IntCodec(Codec):
+    pass
+
+
+class JSONCodec(Codec):
+    # Plain JSON-compatible values
+    pass
+
+
+class LocalCache:
+    """Bounded in-process LRU of decoded results with per-entry expiry.
+
+    Sizes are those of the encoded payloads, which decoded objects grow in
+    proportion to.
+    """
+
+    def __init__(self, max_entries=LOCAL_MAX_ENTRIES, max_bytes=LOCAL_MAX_BYTES):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        expires, _, value = entry
+        if time.time() >= expires:
+            self._pop(key)
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, size, expires):
+        if size > self._max_bytes:
+            return
+        if key in self._entries:
+            self._pop(key)
+        self._entries[key] = (expires, size, value)
+        self._bytes += size
+        while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+            self._pop(next(iter(self._entries)))
+        LOCAL_CACHE_ENTRIES.set(len(self._entries))
+        LOCAL_CACHE_BYTES.set(self._bytes)
+
+    def _pop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+class QueryCache:
+    """Redis result cache with request coalescing and stale-while-revalidate.
+
+    Concurrent misses for the same key in this process share one in-flight
+    future. With `distributed_lock` enabled, replicas also race for a short
+    Redis lock so only one of them recomputes; the others poll for the
+    value it writes.
+
+    Entries are fresh for `ex` seconds and then served stale for up to
+    `stale_ex` more while a background task recomputes them, so callers
+    only wait on Mongo when an entry is missing altogether. Freshness is
+    read off the key's remaining TTL, so a refresh that computes the same
+    payload only extends the TTL instead of writing the entry again.
+
+    Given a `BlockTracker`, entries for queries over `collections` are keyed
+    by those collections' indexed block heights, so new data invalidates
+    them immediately and unchanged data stays cached for `VERSIONED_TTL`.
+
+    Every lookup is a single round-trip, and every write is pipelined with
+    its TTL and the lock release. `batched()` gives each request a copy
+    whose lookups, and lock acquisitions, made in the same tick share one
+    pipeline and which counts its round-trips in `round_trips`.
+
+    Given a `LocalCache`, fresh results are also kept decoded in process
+    for up to their namespace's `LOCAL_NAMESPACE_MAX_AGE`, so the hottest
+    keys cost neither a round-trip nor decoding.
+    """
+
+    def __init__(
+        self,
+        redis,
+        distributed_lock=True,
+        lock_timeout=LOCK_TIMEOUT,
+        stale_ttl=STALE_TTL,
+        blocks=None,
+        local=None,
+    ):
+        self._redis = redis
+        self._blocks = blocks
+        self._local = local
+        self._distributed_lock = distributed_lock
+        self._lock_timeout = lock_timeout
+        self._stale_ttl = stale_ttl
+        self._inflight = {}
+        self._refreshes = set()
+        self.round_trips = 0
+
+    def batched(self):
+        # Shares in-flight computations and refreshes with this cache, but
+        # lookups made in the same tick go out as one pipeline
+        cache = copy.copy(self)
+        cache.round_trips = 0
+        cache._lookup = DataLoader(load_fn=cache._lookup_many, cache=False).load
+        # Misses of one tick also take their locks together, so their
+        # computations start, and reach the request's loaders, together
+        cache._acquire = DataLoader(load_fn=cache._acquire_many, cache=False).load
+        return cache
+
+    async def _execute(self, pipe):
+        # Every Redis call of the cache is a pipeline sent through here
+        self.round_trips += 1
+        return await pipe.execute()
+
+    async def _lookup_many(self, keys):
+        # Each entry with its remaining TTL in milliseconds
+        pipe = self._redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.get(key)
+            pipe.pttl(key)
+        results = await self._execute(pipe)
+        return list(zip(results[::2], results[1::2]))
+
+    async def _lookup(self, key):
+        return (await self._lookup_many([key]))[0]
+
+    async def _acquire_many(self, locks):
+        # Whether each (lock_key, token) lock was taken
+        pipe = self._redis.pipeline(transaction=False)
+        for lock_key, token in locks:
+            pipe.set(lock_key, token, nx=True, ex=self._lock_timeout)
+        return await self._execute(pipe)
+
+    async def _acquire(self, lock):
+        return (await self._acquire_many([lock]))[0]
+
+    async def get_or_compute(
+        self, key, compute, codec, ex=60, stale_ex=None, collections=None
+    ):
+        if stale_ex is None:
+            stale_ex = self._stale_ttl
+
+        # Fall back to the plain TTL while block heights are unavailable
+        version = None
+        if collections and self._blocks is not None:
+            version = self._blocks.version(collections)
+        if version is not None:
+            key = f"{key}@{version}"
+            ex = max(ex, VERSIONED_TTL)
+
+        namespace = key.split(":", 1)[0]
+        if self._local is not None:
+            result = self._local.get(key)
+            if result is not MISSING:
+                CACHE_REQUESTS.labels(namespace=namespace, result="local").inc()
+                return result
+
+        while True:
+            payload, ttl = await self._lookup(key)
+            if payload is not None:
+                result = self._decode(codec, payload)
+                if result is not MISSING:
+                    # Entries are written to live for ex + stale_ex seconds
+                    fresh_for = ttl / 1000 - stale_ex if ttl >= 0 else ex
+                    fresh_until = time.time() + fresh_for
+                    if fresh_for <= 0:
+                        CACHE_REQUESTS.labels(namespace=namespace, result="stale").inc()
+                        self._schedule_refresh(
+                            key, compute, codec, ex, stale_ex, payload
+                        )
+                    else:
+                        CACHE_REQUESTS.labels(namespace=namespace, result="fresh").inc()
+                        self._keep_local(key, result, len(payload), fresh_until)
+                    return result
+
+            CACHE_REQUESTS.labels(namespace=namespace, result="miss").inc()
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                return await self._compute_in_flight(key, compute, codec, ex, stale_ex)
+            # Followers of a skipped flight look again, as whoever took over
+            # may have written the entry or be computing it already
+            result = await asyncio.shield(inflight)
+            if result is not SKIPPED:
+                return result
+
+    def _keep_local(self, key, result, size, fresh_until):
+        if self._local is None:
+            return
+        namespace = key.split(":", 1)[0]
+        max_age = LOCAL_NAMESPACE_MAX_AGE.get(namespace, LOCAL_MAX_AGE)
+        if max_age:
+            self._local.set(key, result, size, min(fresh_until, time.time() + max_age))
+
+    def _decode(self, codec, payload):
+        # Entries written in another format are recomputed
+        try:
+            return codec.decode(payload)
+        except CodecError:
+            return MISSING
+
+    def _schedule_refresh(self, key, compute, codec, ex, stale_ex, previous):
+        if key in self._inflight:
+            return
+        # Register the flight now so later stale hits do not schedule another
+        inflight = self._begin_flight(key)
+        task = asyncio.create_task(
+            self._refresh(key, inflight, compute, codec, ex, stale_ex, previous)
+        )
+        # Hold a reference until the refresh is done
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    async def _refresh(self, key, inflight, compute, codec, ex, stale_ex, previous):
+        try:
+            await self._fly(
+                key,
+                inflight,
+                compute,
+                codec,
+                ex,
+                stale_ex,
+                previous=previous,
+                wait_for_lock=False,
+            )
+        except Exception:
+            logger.exception(f"Failed to refresh cache entry {key}")
+
+    def _begin_flight(self, key):
+        inflight = asyncio.get_running_loop().create_future()
+        self._inflight[key] = inflight
+        return inflight
+
+    async def _compute_in_flight(self, key, compute, codec, ex, stale_ex):
+        inflight = self._begin_flight(key)
+        return await self._fly(key, inflight, compute, codec, ex, stale_ex)
+
+    async def _fly(
+        self,
+        key,
+        inflight,
+        compute,
+        codec,
+        ex,
+        stale_ex,
+        previous=None,
+        wait_for_lock=True,
+    ):
+        try:
+            result = await self._compute(
+                key, compute, codec, ex, stale_ex, previous, wait_for_lock
+            )
+        except asyncio.CancelledError:
+            # Only the caller gave up, not the requests following it
+            inflight.set_result(SKIPPED)
+            raise
+        except BaseException as e:
+            inflight.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            inflight.exception()
+            raise
+        else:
+            inflight.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    async def _compute_and_set(
+        self, key, compute, codec, ex, stale_ex, previous=None, lock=None
+    ):
+        try:
+            result = await compute()
+            payload = codec.encode(result)
+        except BaseException:
+            if lock is not None:
+                await asyncio.shield(self._release(*lock))
+            raise
+
+        pipe = self._redis.pipeline(transaction=False)
+        if payload == previous:
+            # Same payload as the stale entry, only make it fresh again
+            pipe.expire(key, ex + stale_ex)
+        else:
+            pipe.set(key, payload, ex=ex + stale_ex)
+        if lock is not None:
+            self._release_in(pipe, *lock)
+        await self._execute(pipe)
+
+        self._keep_local(key, result, len(payload), time.time() + ex)
+        return result
+
+    def _release_in(self, pipe, lock_key, token):
+        # EVAL rather than a registered script, which pipelines would check
+        # for with a round-trip of its own
+        pipe.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+    async def _release(self, lock_key, token):
+        pipe = self._redis.pipeline(transaction=False)
+        self._release_in(pipe, lock_key, token)
+        await self._execute(pipe)
+
+    async def _compute(
+        self, key, compute, codec, ex, stale_ex, previous, wait_for_lock
+    ):
+        if not self._distributed_lock:
+            return await self._compute_and_set(
+                key, compute, codec, ex, stale_ex, previous
+            )
+
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        if await self._acquire((lock_key, token)):
+            return await self._compute_and_set(
+                key, compute, codec, ex, stale_ex, previous, (lock_key, token)
+            )
+
+        # Another replica is already refreshing this entry
+        if not wait_for_lock:
+            return SKIPPED
+
+        # Another replica is recomputing, wait for its result
+        deadline = time.monotonic() + self._lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.exists(lock_key)
+            payload, locked = await self._execute(pipe)
+            result = self._decode(codec, payload) if payload is not None else MISSING
+            if result is not MISSING:
+                return result
+            if not locked:
+                break
+
+        # The lock holder failed or is too slow, compute it ourselves
+        return await self._compute_and_set(key, compute, codec, ex, stale_ex)
@@ -1,3 +1,6 @@
+from types import MappingProxyType
+
+
 class Config:
     def __init__(self):
         self.BEASTS = {
@@ -820,3 +823,19 @@ class Config:
         }
 
         self.ATTACKERS = {1: "Adventurer", 2: "Beast"}
+
+        # Freeze every id -> name table and index it by name, so parsing enum
+        # scalars is a dict lookup rather than a scan. Where a name repeats
+        # the first id wins, as it did with utils.get_key_by_value.
+        self._ids = {}
+        for attr, table in list(vars(self).items()):
+            if attr.startswith("_"):
+                continue
+            ids = {}
+            for key, value in table.items():
+                ids.setdefault(value, key)
+            setattr(self, attr, MappingProxyType(table))
+            self._ids[attr] = MappingProxyType(ids)
+
+    def get_id(self, table, name):
+        return self._ids[table].get(name)
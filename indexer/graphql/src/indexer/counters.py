@@ -0,0 +1,143 @@
+import logging
+import time
+import uuid
+from collections import Counter
+
+from indexer.materialized import BUILD_TIMEOUT, MaterializedView
+
+logger = logging.getLogger(__name__)
+
+# Hash of adventurer counts: "<kind>" globally and "<kind>:<owner>" per owner
+COUNTERS_KEY = "counters:adventurers"
+
+# Counts are read on every request, so keep them closer to the head
+COUNTERS_SYNC_INTERVAL = 1
+
+HSET_BATCH_SIZE = 10_000
+
+# Kinds of adventurer counts
+TOTAL = "total"
+ALIVE = "alive"
+DEAD = "dead"
+
+
+def get_state(doc):
+    # What an adventurer version contributes to the counts
+    health = doc.get("health")
+    if health == 0:
+        status = DEAD
+    elif health is not None and health > 0:
+        status = ALIVE
+    else:
+        status = ""
+    return f"{doc.get('owner')}\t{status}"
+
+
+def get_fields(state):
+    owner, status = state.split("\t")
+    fields = [TOTAL, f"{TOTAL}:{owner}"]
+    if status:
+        fields += [status, f"{status}:{owner}"]
+    return fields
+
+
+class AdventurerCounters(MaterializedView):
+    """Adventurer totals, alive and dead counts, globally and per owner.
+
+    Next to the counts, a state hash records what each adventurer currently
+    contributes to them. Syncing compares new versions against it and
+    applies only the differences, so replaying a block changes nothing.
+    Two syncs at once would both apply them, which the maintainer lease
+    rules out.
+    """
+
+    collection = "adventurers"
+    key = COUNTERS_KEY
+    sync_interval = COUNTERS_SYNC_INTERVAL
+
+    def __init__(self, db, redis, key=None):
+        super().__init__(db, redis, key)
+        self._state_key = f"{self._key}:state"
+
+    async def build(self):
+        # Read the head first so the following sync replays anything written
+        # while the snapshot was taken
+        last_block = await self._latest_block()
+        docs = await self._db["adventurers"].find(
+            {"_cursor.to": None},
+            {"_id": 0, "id": 1, "owner": 1, "health": 1},
+            timeout=BUILD_TIMEOUT,
+        )
+
+        states = {str(doc["id"]): get_state(doc) for doc in docs}
+        counts = Counter({TOTAL: 0, ALIVE: 0, DEAD: 0})
+        for state in states.values():
+            counts.update(get_fields(state))
+
+        # Build into scratch keys of this build's own and swap both in
+        # atomically
+        build = uuid.uuid4().hex
+        scratch_key = f"{self._key}:build:{build}"
+        scratch_state_key = f"{self._state_key}:build:{build}"
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.hset(scratch_key, mapping=dict(counts))
+            items = list(states.items())
+            for i in range(0, len(items), HSET_BATCH_SIZE):
+                batch = dict(items[i : i + HSET_BATCH_SIZE])
+                pipe.hset(scratch_state_key, mapping=batch)
+            await pipe.execute()
+
+            pipe = self._redis.pipeline(transaction=True)
+            pipe.rename(scratch_key, self._key)
+            if states:
+                pipe.rename(scratch_state_key, self._state_key)
+            else:
+                pipe.delete(self._state_key)
+            self._mark_built(pipe)
+            await pipe.execute()
+        except Exception:
+            await self._redis.delete(scratch_key, scratch_state_key)
+            raise
+
+        self._last_block = last_block
+        self._last_build = time.monotonic()
+        self.ready = True
+        logger.info(f"Built adventurer counters for {len(states)} adventurers")
+
+    async def sync(self):
+        docs = await self._changed_since_last_block(
+            {"_id": 0, "id": 1, "owner": 1, "health": 1}
+        )
+        if not docs:
+            return
+
+        ids = [str(doc["id"]) for doc in docs]
+        previous = await self._redis.hmget(self._state_key, ids)
+
+        deltas = Counter()
+        states = {}
+        for id, doc, old in zip(ids, docs, previous):
+            state = get_state(doc)
+            if old is not None:
+                old = old.decode()
+                if old == state:
+                    continue
+                deltas.subtract(get_fields(old))
+            deltas.update(get_fields(state))
+            states[id] = state
+
+        if states:
+            pipe = self._redis.pipeline(transaction=True)
+            for field, delta in deltas.items():
+                if delta:
+                    pipe.hincrby(self._key, field, delta)
+            pipe.hset(self._state_key, mapping=states)
+            await pipe.execute()
+
+        self._last_block = max(doc["_cursor"]["from"] for doc in docs)
+
+    async def count(self, kind, owner=None):
+        field = f"{kind}:{owner}" if owner else kind
+        value = await self._redis.hget(self._key, field)
+        return int(value or 0)
@@ -0,0 +1,194 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo import MongoClient
+
+from prometheus_client import Gauge, Histogram
+
+# Number of Mongo queries allowed to run concurrently per process
+DEFAULT_POOL_SIZE = 32
+
+# Per-query timeout in seconds
+DEFAULT_QUERY_TIMEOUT = 10
+
+POOL_SIZE = Gauge("mongo_pool_size", "Concurrent Mongo query slots.")
+POOL_IN_USE = Gauge("mongo_pool_in_use", "Mongo query slots in use.")
+POOL_WAIT = Histogram(
+    "mongo_pool_wait_seconds", "Time spent waiting for a Mongo query slot."
+)
+
+
+def get_find_command(name, filter, projection=None, sort=None, skip=0, limit=0):
+    # The find command equivalent to a cursor, for explain and logging
+    command = {"find": name, "filter": filter}
+    if projection:
+        command["projection"] = projection
+    if sort:
+        command["sort"] = dict(sort)
+    if skip:
+        command["skip"] = skip
+    if limit:
+        command["limit"] = limit
+    return command
+
+
+class AsyncCollection:
+    """Awaitable wrapper around a pymongo collection.
+
+    Every query is fully consumed inside the executor so no network I/O
+    ever happens on the event loop.
+    """
+
+    def __init__(self, db, collection):
+        self._db = db
+        self._collection = collection
+
+    @property
+    def name(self):
+        return self._collection.name
+
+    async def _run(self, operation, command, fn, timeout):
+        instrumentation = self._db.instrumentation
+        if instrumentation is None:
+            return await self._db.run(fn, timeout)
+
+        start = time.perf_counter()
+        result = await self._db.run(fn, timeout)
+        if isinstance(result, list):
+            returned = len(result)
+        else:
+            returned = int(result is not None)
+        instrumentation.observe(
+            self._db,
+            self._collection,
+            operation,
+            command,
+            time.perf_counter() - start,
+            returned,
+        )
+        return result
+
+    async def find(
+        self, filter, projection=None, sort=None, skip=0, limit=0, timeout=None
+    ):
+        timeout = timeout or self._db.query_timeout
+
+        def run():
+            cursor = self._collection.find(
+                filter, projection, max_time_ms=int(timeout * 1000)
+            )
+            if sort:
+                cursor = cursor.sort(sort)
+            if skip:
+                cursor = cursor.skip(skip)
+            if limit:
+                cursor = cursor.limit(limit)
+            return list(cursor)
+
+        command = get_find_command(self.name, filter, projection, sort, skip, limit)
+        return await self._run("find", command, run, timeout)
+
+    async def find_one(self, filter, projection=None, sort=None, timeout=None):
+        timeout = timeout or self._db.query_timeout
+
+        def run():
+            return self._collection.find_one(
+                filter, projection, sort=sort, max_time_ms=int(timeout * 1000)
+            )
+
+        command = get_find_command(self.name, filter, projection, sort, limit=1)
+        return await self._run("find_one", command, run, timeout)
+
+    async def aggregate(self, pipeline, timeout=None):
+        timeout = timeout or self._db.query_timeout
+
+        def run():
+            return list(
+                self._collection.aggregate(pipeline, maxTimeMS=int(timeout * 1000))
+            )
+
+        command = {"aggregate": self.name, "pipeline": pipeline, "cursor": {}}
+        return await self._run("aggregate", command, run, timeout)
+
+    async def count_documents(self, filter, timeout=None):
+        timeout = timeout or self._db.query_timeout
+
+        def run():
+            return self._collection.count_documents(
+                filter, maxTimeMS=int(timeout * 1000)
+            )
+
+        # count_documents runs as this aggregation
+        command = {
+            "aggregate": self.name,
+            "pipeline": [
+                {"$match": filter},
+                {"$group": {"_id": 1, "n": {"$sum": 1}}},
+            ],
+            "cursor": {},
+        }
+        return await self._run("count", command, run, timeout)
+
+
+class AsyncDatabase:
+    """Executor-backed Mongo database with bounded concurrency.
+
+    `pool_size` caps both the number of worker threads and the size of the
+    underlying pymongo connection pool. `query_timeout` (seconds) is enforced
+    server side via maxTimeMS and client side while waiting for a free slot;
+    individual queries may pass a longer `timeout` for background work.
+    Queries are reported to `instrumentation` when one is given.
+    """
+
+    def __init__(
+        self,
+        url,
+        db_name,
+        pool_size=DEFAULT_POOL_SIZE,
+        query_timeout=DEFAULT_QUERY_TIMEOUT,
+        instrumentation=None,
+    ):
+        self._client = MongoClient(url, maxPoolSize=pool_size)
+        self._db = self._client[db_name]
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="mongo"
+        )
+        self._semaphore = asyncio.Semaphore(pool_size)
+        self.pool_size = pool_size
+        self.in_use = 0
+        POOL_SIZE.set(pool_size)
+        self.query_timeout = query_timeout
+        self.instrumentation = instrumentation
+
+    def __getitem__(self, name):
+        return AsyncCollection(self, self._db[name])
+
+    async def run(self, fn, timeout=None):
+        async def acquire_and_run():
+            start = time.perf_counter()
+            await self._semaphore.acquire()
+            POOL_WAIT.observe(time.perf_counter() - start)
+            self.in_use += 1
+            POOL_IN_USE.set(self.in_use)
+            future = asyncio.get_running_loop().run_in_executor(self._executor, fn)
+            # A call that times out keeps running in its thread, so it keeps
+            # its slot until it returns
+            future.add_done_callback(self._release)
+            return await asyncio.shield(future)
+
+        # Allow a small grace period over maxTimeMS for the round-trip itself
+        timeout = timeout or self.query_timeout
+        return await asyncio.wait_for(acquire_and_run(), timeout + 1)
+
+    def _release(self, future):
+        self.in_use -= 1
+        POOL_IN_USE.set(self.in_use)
+        self._semaphore.release()
+        # Nobody is left to retrieve the error of a call that timed out
+        if not future.cancelled():
+            future.exception()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self._client.close()
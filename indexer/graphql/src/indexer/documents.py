@@ -0,0 +1,94 @@
+import hashlib
+from collections import OrderedDict
+
+from strawberry.extensions import SchemaExtension
+
+from prometheus_client import Counter, Gauge
+
+# Distinct query documents kept parsed and validated
+DOCUMENT_CACHE_SIZE = 1000
+
+# Bound on the total length of cached query texts, which their parsed
+# documents grow in proportion to
+DOCUMENT_CACHE_BYTES = 16 * 1024 * 1024
+
+DOCUMENT_CACHE_REQUESTS = Counter(
+    "graphql_document_cache_requests_total",
+    "Parsed document cache lookups by result (hit or miss).",
+    ("result",),
+)
+DOCUMENT_CACHE_ENTRIES = Gauge(
+    "graphql_document_cache_entries", "Documents in the parsed document cache."
+)
+DOCUMENT_CACHE_SIZE_BYTES = Gauge(
+    "graphql_document_cache_bytes", "Length of the query texts cached."
+)
+
+
+class CachedDocument:
+    __slots__ = ("document", "size", "errors")
+
+    def __init__(self, document, size):
+        self.document = document
+        self.size = size
+        # Validation errors, once the document has been validated
+        self.errors = None
+
+
+class DocumentCache(SchemaExtension):
+    """LRU cache of parsed and validated documents keyed by query hash.
+
+    A hit reuses the document strawberry parsed for the same query text
+    and the result of validating it, so hot operations go straight to
+    execution. Entries are bounded both in number and by the total length
+    of their query texts.
+    """
+
+    def __init__(self, maxsize=DOCUMENT_CACHE_SIZE, max_bytes=DOCUMENT_CACHE_BYTES):
+        self._maxsize = maxsize
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def _key(self, query):
+        return hashlib.blake2b(query.encode(), digest_size=16).digest()
+
+    def _put(self, key, entry):
+        if entry.size > self._max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while len(self._entries) > self._maxsize or self._bytes > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+        DOCUMENT_CACHE_ENTRIES.set(len(self._entries))
+        DOCUMENT_CACHE_SIZE_BYTES.set(self._bytes)
+
+    # The hooks below only touch `execution_context` before the operation
+    # yields to the event loop, as this instance is shared by all requests
+
+    def on_parse(self):
+        context = self.execution_context
+        key = self._key(context.query)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            context.graphql_document = entry.document
+            DOCUMENT_CACHE_REQUESTS.labels(result="hit").inc()
+        else:
+            DOCUMENT_CACHE_REQUESTS.labels(result="miss").inc()
+        yield
+        # Documents that failed to parse are left uncached
+        if entry is None and context.graphql_document is not None:
+            self._put(key, CachedDocument(context.graphql_document, len(context.query)))
+
+    def on_validate(self):
+        context = self.execution_context
+        entry = self._entries.get(self._key(context.query))
+        if entry is not None and entry.document is not context.graphql_document:
+            entry = None
+        if entry is not None and entry.errors is not None:
+            context.errors = list(entry.errors)
+        yield
+        if entry is not None and entry.errors is None:
+            entry.errors = list(context.errors or [])
@@ -1,18 +1,78 @@
 import asyncio
-from typing import List, NewType, Optional, Dict, Union, Any
+import dataclasses
+import heapq
+from functools import lru_cache, partial
+from itertools import islice
+from typing import (
+    List,
+    NewType,
+    Optional,
+    Dict,
+    Union,
+    Tuple,
+    TypeVar,
+    Generic,
+    get_args,
+)
 import ssl
-import json
 import logging
+import multiprocessing
+import signal
+import time
 
 import strawberry
 import aiohttp_cors
 from aiohttp import web
-import aioredis
-from pymongo import MongoClient
 from strawberry.aiohttp.views import GraphQLView
-from indexer.utils import get_key_by_value
+from indexer.utils import (
+    encode_cursor,
+    decode_cursor,
+    get_keyset_filter,
+)
 from indexer.config import Config
+from indexer.db import AsyncDatabase, DEFAULT_POOL_SIZE, DEFAULT_QUERY_TIMEOUT
+from indexer.counters import ALIVE, DEAD, TOTAL, AdventurerCounters
+from indexer.leaderboard import RankIndex
+from indexer.documents import DocumentCache
+from indexer.loaders import Loaders
+from indexer.handler import IndexerHTTPHandler
+from indexer.persisted import PersistedQueries
+from indexer.redis_pool import (
+    DEFAULT_REDIS_CONNECT_TIMEOUT,
+    DEFAULT_REDIS_HEALTH_CHECK_INTERVAL,
+    DEFAULT_REDIS_POOL_SIZE,
+    DEFAULT_REDIS_POOL_TIMEOUT,
+    DEFAULT_REDIS_TIMEOUT,
+    connect_redis,
+)
+from indexer.blocks import BlockTracker
+from indexer.instrumentation import (
+    GraphQLMetrics,
+    QueryInstrumentation,
+    SLOW_QUERY_MS,
+    EXPLAIN_SAMPLE_RATE,
+)
+from indexer.metrics import (
+    DEFAULT_METRICS_PORT,
+    metrics_handler,
+    metrics_middleware,
+    monitor_event_loop,
+    serve_metrics,
+)
+from indexer.cache import (
+    QueryCache,
+    LocalCache,
+    make_cache_key,
+    Codec,
+    ObjectListCodec,
+    IntCodec,
+    JSONCodec,
+    STALE_TTL,
+    LOCAL_MAX_BYTES,
+    REDIS_ROUND_TRIPS,
+)
 from strawberry.types import Info
+from strawberry.types.nodes import SelectedField
 
 config = Config()
 
@@ -23,6 +83,18 @@ logger = logging.getLogger(__name__)
 # Define a maximum limit constant
 MAX_DOCUMENT_LIMIT = 101
 
+# How often the supervisor checks on its workers
+WORKER_POLL_INTERVAL = 1
+
+# A worker exiting this soon after it started failed to start at all
+WORKER_STARTUP_GRACE = 10
+
+# Restarts of a worker that keeps failing to start back off exponentially,
+# and the supervisor gives up after this many failures in a row
+WORKER_RESTART_DELAY = 1
+WORKER_MAX_RESTART_DELAY = 60
+WORKER_MAX_STARTUP_FAILURES = 5
+
 
 def parse_u256(value):
     return value * (10**18)
@@ -70,7 +142,7 @@ def serialize_string(value):
 
 
 def parse_class(value):
-    return get_key_by_value(str(value), config.CLASSES)
+    return config.get_id("CLASSES", str(value))
 
 
 def serialize_class(value):
@@ -78,7 +150,7 @@ def serialize_class(value):
 
 
 def parse_beast(value):
-    return get_key_by_value(str(value), config.BEASTS)
+    return config.get_id("BEASTS", str(value))
 
 
 def serialize_beast(value):
@@ -86,7 +158,7 @@ def serialize_beast(value):
 
 
 def parse_adventurer_status(value):
-    return get_key_by_value(str(value), config.ADVENTURER_STATUS)
+    return config.get_id("ADVENTURER_STATUS", str(value))
 
 
 def serialize_adventurer_status(value):
@@ -94,7 +166,7 @@ def serialize_adventurer_status(value):
 
 
 def parse_discovery(value):
-    return get_key_by_value(str(value), config.DISCOVERY_TYPES)
+    return config.get_id("DISCOVERY_TYPES", str(value))
 
 
 def serialize_discovery(value):
@@ -102,7 +174,7 @@ def serialize_discovery(value):
 
 
 def parse_sub_discovery(value):
-    return get_key_by_value(str(value), config.SUB_DISCOVERY_TYPES)
+    return config.get_id("SUB_DISCOVERY_TYPES", str(value))
 
 
 def serialize_sub_discovery(value):
@@ -110,7 +182,7 @@ def serialize_sub_discovery(value):
 
 
 def parse_obstacle(value):
-    return get_key_by_value(value, config.OBSTACLES)
+    return config.get_id("OBSTACLES", value)
 
 
 def serialize_obstacle(value):
@@ -118,7 +190,7 @@ def serialize_obstacle(value):
 
 
 def parse_attacker(value):
-    return get_key_by_value(str(value), config.ATTACKERS)
+    return config.get_id("ATTACKERS", str(value))
 
 
 def serialize_attacker(value):
@@ -126,7 +198,7 @@ def serialize_attacker(value):
 
 
 def parse_item(value):
-    return get_key_by_value(str(value), config.ITEMS)
+    return config.get_id("ITEMS", str(value))
 
 
 def serialize_item(value):
@@ -134,7 +206,7 @@ def serialize_item(value):
 
 
 def parse_material(value):
-    return get_key_by_value(str(value), config.MATERIALS)
+    return config.get_id("MATERIALS", str(value))
 
 
 def serialize_material(value):
@@ -142,7 +214,7 @@ def serialize_material(value):
 
 
 def parse_item_type(value):
-    return get_key_by_value(str(value), config.ITEM_TYPES)
+    return config.get_id("ITEM_TYPES", str(value))
 
 
 def serialize_item_type(value):
@@ -150,7 +222,7 @@ def serialize_item_type(value):
 
 
 def parse_special_2(value):
-    return get_key_by_value(str(value), config.ITEM_NAME_PREFIXES)
+    return config.get_id("ITEM_NAME_PREFIXES", str(value))
 
 
 def serialize_special_2(value):
@@ -158,7 +230,7 @@ def serialize_special_2(value):
 
 
 def parse_special_3(value):
-    return get_key_by_value(str(value), config.ITEM_NAME_SUFFIXES)
+    return config.get_id("ITEM_NAME_SUFFIXES", str(value))
 
 
 def serialize_special_3(value):
@@ -166,7 +238,7 @@ def serialize_special_3(value):
 
 
 def parse_special_1(value):
-    return get_key_by_value(str(value), config.ITEM_SUFFIXES)
+    return config.get_id("ITEM_SUFFIXES", str(value))
 
 
 def serialize_special_1(value):
@@ -174,7 +246,7 @@ def serialize_special_1(value):
 
 
 def parse_item_status(value):
-    return get_key_by_value(str(value), config.ITEM_STATUS)
+    return config.get_id("ITEM_STATUS", str(value))
 
 
 def serialize_item_status(value):
@@ -182,7 +254,7 @@ def serialize_item_status(value):
 
 
 def parse_slot(value):
-    return get_key_by_value(str(value), config.SLOTS)
+    return config.get_id("SLOTS", str(value))
 
 
 def serialize_slot(value):
@@ -190,7 +262,7 @@ def serialize_slot(value):
 
 
 def parse_adventurer(value):
-    return get_key_by_value(str(value), config.ATTACKERS)
+    return config.get_id("ATTACKERS", str(value))
 
 
 def serialize_adventurer(value):
@@ -198,7 +270,7 @@ def serialize_adventurer(value):
 
 
 def parse_item_tier(value):
-    return get_key_by_value(str(value), config.ITEM_TIERS)
+    return config.get_id("ITEM_TIERS", str(value))
 
 
 def serialize_item_tier(value):
@@ -351,7 +423,7 @@ class U256ValueFilter:
 class StringFilter:
     eq: Optional[StringValue] = None
     _in: Optional[List[StringValue]] = None
-    notIn: Optional[StringValue] = None
+    notIn: Optional[List[StringValue]] = None
     lt: Optional[StringValue] = None
     lte: Optional[StringValue] = None
     gt: Optional[StringValue] = None
@@ -499,7 +571,7 @@ class BooleanFilter:
 class ClassFilter:
     eq: Optional[ClassValue] = None
     _in: Optional[List[ClassValue]] = None
-    notIn: Optional[ClassValue] = None
+    notIn: Optional[List[ClassValue]] = None
     lt: Optional[ClassValue] = None
     lte: Optional[ClassValue] = None
     gt: Optional[ClassValue] = None
@@ -527,7 +599,7 @@ class ClassFilter:
 class BeastFilter:
     eq: Optional[BeastValue] = None
     _in: Optional[List[BeastValue]] = None
-    notIn: Optional[BeastValue] = None
+    notIn: Optional[List[BeastValue]] = None
     lt: Optional[BeastValue] = None
     lte: Optional[BeastValue] = None
     gt: Optional[BeastValue] = None
@@ -555,7 +627,7 @@ class BeastFilter:
 class AdventurerStatusFilter:
     eq: Optional[AdventurerStatusValue] = None
     _in: Optional[List[AdventurerStatusValue]] = None
-    notIn: Optional[AdventurerStatusValue] = None
+    notIn: Optional[List[AdventurerStatusValue]] = None
     lt: Optional[AdventurerStatusValue] = None
     lte: Optional[AdventurerStatusValue] = None
     gt: Optional[AdventurerStatusValue] = None
@@ -583,7 +655,7 @@ class AdventurerStatusFilter:
 class DiscoveryFilter:
     eq: Optional[DiscoveryValue] = None
     _in: Optional[List[DiscoveryValue]] = None
-    notIn: Optional[DiscoveryValue] = None
+    notIn: Optional[List[DiscoveryValue]] = None
     lt: Optional[DiscoveryValue] = None
     lte: Optional[DiscoveryValue] = None
     gt: Optional[DiscoveryValue] = None
@@ -611,7 +683,7 @@ class DiscoveryFilter:
 class SubDiscoveryFilter:
     eq: Optional[SubDiscoveryValue] = None
     _in: Optional[List[SubDiscoveryValue]] = None
-    notIn: Optional[SubDiscoveryValue] = None
+    notIn: Optional[List[SubDiscoveryValue]] = None
     lt: Optional[SubDiscoveryValue] = None
     lte: Optional[SubDiscoveryValue] = None
     gt: Optional[SubDiscoveryValue] = None
@@ -639,7 +711,7 @@ class SubDiscoveryFilter:
 class ObstacleFilter:
     eq: Optional[ObstacleValue] = None
     _in: Optional[List[ObstacleValue]] = None
-    notIn: Optional[ObstacleValue] = None
+    notIn: Optional[List[ObstacleValue]] = None
     lt: Optional[ObstacleValue] = None
     lte: Optional[ObstacleValue] = None
     gt: Optional[ObstacleValue] = None
@@ -677,7 +749,7 @@ class AttackerFilter:
 class ItemFilter:
     eq: Optional[ItemValue] = None
     _in: Optional[List[ItemValue]] = None
-    notIn: Optional[ItemValue] = None
+    notIn: Optional[List[ItemValue]] = None
     lt: Optional[ItemValue] = None
     lte: Optional[ItemValue] = None
     gt: Optional[ItemValue] = None
@@ -705,7 +777,7 @@ class ItemFilter:
 class MaterialFilter:
     eq: Optional[MaterialValue] = None
     _in: Optional[List[MaterialValue]] = None
-    notIn: Optional[MaterialValue] = None
+    notIn: Optional[List[MaterialValue]] = None
     lt: Optional[MaterialValue] = None
     lte: Optional[MaterialValue] = None
     gt: Optional[MaterialValue] = None
@@ -737,7 +809,7 @@ class MaterialFilter:
 class TypeFilter:
     eq: Optional[ItemTypeValue] = None
     _in: Optional[List[ItemTypeValue]] = None
-    notIn: Optional[ItemTypeValue] = None
+    notIn: Optional[List[ItemTypeValue]] = None
     lt: Optional[ItemTypeValue] = None
     lte: Optional[ItemTypeValue] = None
     gt: Optional[ItemTypeValue] = None
@@ -769,7 +841,7 @@ class TypeFilter:
 class Special1Filter:
     eq: Optional[Special1Value] = None
     _in: Optional[List[Special1Value]] = None
-    notIn: Optional[Special1Value] = None
+    notIn: Optional[List[Special1Value]] = None
     lt: Optional[Special1Value] = None
     lte: Optional[Special1Value] = None
     gt: Optional[Special1Value] = None
@@ -801,7 +873,7 @@ class Special1Filter:
 class Special2Filter:
     eq: Optional[Special2Value] = None
     _in: Optional[List[Special2Value]] = None
-    notIn: Optional[Special2Value] = None
+    notIn: Optional[List[Special2Value]] = None
     lt: Optional[Special2Value] = None
     lte: Optional[Special2Value] = None
     gt: Optional[Special2Value] = None
@@ -833,7 +905,7 @@ class Special2Filter:
 class Special3Filter:
     eq: Optional[Special3Value] = None
     _in: Optional[List[Special3Value]] = None
-    notIn: Optional[Special3Value] = None
+    notIn: Optional[List[Special3Value]] = None
     lt: Optional[Special3Value] = None
     lte: Optional[Special3Value] = None
     gt: Optional[Special3Value] = None
@@ -865,7 +937,7 @@ class Special3Filter:
 class StatusFilter:
     eq: Optional[StatusValue] = None
     _in: Optional[List[StatusValue]] = None
-    notIn: Optional[StatusValue] = None
+    notIn: Optional[List[StatusValue]] = None
     lt: Optional[StatusValue] = None
     lte: Optional[StatusValue] = None
     gt: Optional[StatusValue] = None
@@ -897,7 +969,7 @@ class StatusFilter:
 class SlotFilter:
     eq: Optional[SlotValue] = None
     _in: Optional[List[SlotValue]] = None
-    notIn: Optional[SlotValue] = None
+    notIn: Optional[List[SlotValue]] = None
     lt: Optional[SlotValue] = None
     lte: Optional[SlotValue] = None
     gt: Optional[SlotValue] = None
@@ -925,7 +997,7 @@ class SlotFilter:
 class ItemTierFilter:
     eq: Optional[ItemTierValue] = None
     _in: Optional[List[ItemTierValue]] = None
-    notIn: Optional[ItemTierValue] = None
+    notIn: Optional[List[ItemTierValue]] = None
     lt: Optional[ItemTierValue] = None
     lte: Optional[ItemTierValue] = None
     gt: Optional[ItemTierValue] = None
@@ -957,7 +1029,7 @@ class ItemTierFilter:
 class ItemTypeFilter:
     eq: Optional[ItemTypeValue] = None
     _in: Optional[List[ItemTypeValue]] = None
-    notIn: Optional[ItemTypeValue] = None
+    notIn: Optional[List[ItemTypeValue]] = None
     lt: Optional[ItemTypeValue] = None
     lte: Optional[ItemTypeValue] = None
     gt: Optional[ItemTypeValue] = None
@@ -1643,42 +1715,127 @@ class Adventurer:
     lastUpdatedTime: Optional[str]
     timestamp: Optional[str]
 
+    # Related documents, batched across adventurers by adventurerId
+
+    @strawberry.field
+    async def items(
+        self,
+        info: Info,
+        limit: Optional[int] = 10,
+        skip: Optional[int] = 0,
+        orderBy: Optional[ItemsOrderByInput] = {},
+    ) -> List["Item"]:
+        return await find_adventurer_related(
+            info, "items", Item, get_items_filter(None), self.id, orderBy, skip, limit
+        )
+
+    @strawberry.field
+    async def beasts(
+        self,
+        info: Info,
+        limit: Optional[int] = 10,
+        skip: Optional[int] = 0,
+        orderBy: Optional[BeastsOrderByInput] = {},
+    ) -> List["Beast"]:
+        return await find_adventurer_related(
+            info,
+            "beasts",
+            Beast,
+            get_beasts_filter(None),
+            self.id,
+            orderBy,
+            skip,
+            limit,
+        )
+
+    @strawberry.field
+    async def battles(
+        self,
+        info: Info,
+        limit: Optional[int] = 10,
+        skip: Optional[int] = 0,
+        orderBy: Optional[BattlesOrderByInput] = {},
+    ) -> List["Battle"]:
+        return await find_adventurer_related(
+            info,
+            "battles",
+            Battle,
+            get_battles_filter(None),
+            self.id,
+            orderBy,
+            skip,
+            limit,
+        )
+
+    @strawberry.field
+    async def discoveries(
+        self,
+        info: Info,
+        limit: Optional[int] = 10,
+        skip: Optional[int] = 0,
+        orderBy: Optional[DiscoveriesOrderByInput] = {},
+    ) -> List["Discovery"]:
+        return await find_adventurer_related(
+            info,
+            "discoveries",
+            Discovery,
+            get_discoveries_filter(None),
+            self.id,
+            orderBy,
+            skip,
+            limit,
+        )
+
+    @strawberry.field
+    async def score(self, info: Info) -> Optional["Score"]:
+        scores = await find_adventurer_related(
+            info,
+            "scores",
+            Score,
+            get_scores_filter(None),
+            self.id,
+            ScoresOrderByInput(),
+            0,
+            1,
+        )
+        return scores[0] if scores else None
+
     @classmethod
     def from_mongo(cls, data):
         return cls(
-            id=data["id"],
-            entropy=data["entropy"],
-            owner=data["owner"],
-            name=data["name"],
-            health=data["health"],
-            strength=data["strength"],
-            dexterity=data["dexterity"],
-            vitality=data["vitality"],
-            intelligence=data["intelligence"],
-            wisdom=data["wisdom"],
-            charisma=data["charisma"],
-            luck=data["luck"],
-            xp=data["xp"],
-            level=data["level"],
-            weapon=data["weapon"],
-            chest=data["chest"],
-            head=data["head"],
-            waist=data["waist"],
-            foot=data["foot"],
-            hand=data["hand"],
-            neck=data["neck"],
-            ring=data["ring"],
-            beastHealth=data["beastHealth"],
-            statUpgrades=data["statUpgrades"],
-            birthDate=data["birthDate"],
-            deathDate=data["deathDate"],
-            goldenTokenId=data["goldenTokenId"],
-            customRenderer=data["customRenderer"],
-            battleActionCount=data["battleActionCount"],
-            gold=data["gold"],
-            createdTime=data["createdTime"],
-            lastUpdatedTime=data["lastUpdatedTime"],
-            timestamp=data["timestamp"],
+            id=data.get("id"),
+            entropy=data.get("entropy"),
+            owner=data.get("owner"),
+            name=data.get("name"),
+            health=data.get("health"),
+            strength=data.get("strength"),
+            dexterity=data.get("dexterity"),
+            vitality=data.get("vitality"),
+            intelligence=data.get("intelligence"),
+            wisdom=data.get("wisdom"),
+            charisma=data.get("charisma"),
+            luck=data.get("luck"),
+            xp=data.get("xp"),
+            level=data.get("level"),
+            weapon=data.get("weapon"),
+            chest=data.get("chest"),
+            head=data.get("head"),
+            waist=data.get("waist"),
+            foot=data.get("foot"),
+            hand=data.get("hand"),
+            neck=data.get("neck"),
+            ring=data.get("ring"),
+            beastHealth=data.get("beastHealth"),
+            statUpgrades=data.get("statUpgrades"),
+            birthDate=data.get("birthDate"),
+            deathDate=data.get("deathDate"),
+            goldenTokenId=data.get("goldenTokenId"),
+            customRenderer=data.get("customRenderer"),
+            battleActionCount=data.get("battleActionCount"),
+            gold=data.get("gold"),
+            createdTime=data.get("createdTime"),
+            lastUpdatedTime=data.get("lastUpdatedTime"),
+            timestamp=data.get("timestamp"),
         )
 
 
@@ -1691,9 +1848,9 @@ class Score:
     @classmethod
     def from_mongo(cls, data):
         return cls(
-            adventurerId=data["adventurerId"],
-            timestamp=data["timestamp"],
-            totalPayout=data["totalPayout"],
+            adventurerId=data.get("adventurerId"),
+            timestamp=data.get("timestamp"),
+            totalPayout=data.get("totalPayout"),
         )
 
 
@@ -1726,29 +1883,29 @@ class Discovery:
     @classmethod
     def from_mongo(cls, data):
         return cls(
-            adventurerId=data["adventurerId"],
-            adventurerHealth=data["adventurerHealth"],
-            discoveryType=data["discoveryType"],
-            subDiscoveryType=data["subDiscoveryType"],
-            outputAmount=data["outputAmount"],
-            obstacle=data["obstacle"],
-            obstacleLevel=data["obstacleLevel"],
-            dodgedObstacle=data["dodgedObstacle"],
-            damageTaken=data["damageTaken"],
-            damageLocation=data["damageLocation"],
-            xpEarnedAdventurer=data["xpEarnedAdventurer"],
-            xpEarnedItems=data["xpEarnedItems"],
-            entity=data["entity"],
-            entityLevel=data["entityLevel"],
-            entityHealth=data["entityHealth"],
-            special1=data["special1"],
-            special2=data["special2"],
-            special3=data["special3"],
-            ambushed=data["ambushed"],
-            discoveryTime=data["discoveryTime"],
-            timestamp=data["timestamp"],
-            seed=data["seed"],
-            txHash=data["txHash"],
+            adventurerId=data.get("adventurerId"),
+            adventurerHealth=data.get("adventurerHealth"),
+            discoveryType=data.get("discoveryType"),
+            subDiscoveryType=data.get("subDiscoveryType"),
+            outputAmount=data.get("outputAmount"),
+            obstacle=data.get("obstacle"),
+            obstacleLevel=data.get("obstacleLevel"),
+            dodgedObstacle=data.get("dodgedObstacle"),
+            damageTaken=data.get("damageTaken"),
+            damageLocation=data.get("damageLocation"),
+            xpEarnedAdventurer=data.get("xpEarnedAdventurer"),
+            xpEarnedItems=data.get("xpEarnedItems"),
+            entity=data.get("entity"),
+            entityLevel=data.get("entityLevel"),
+            entityHealth=data.get("entityHealth"),
+            special1=data.get("special1"),
+            special2=data.get("special2"),
+            special3=data.get("special3"),
+            ambushed=data.get("ambushed"),
+            discoveryTime=data.get("discoveryTime"),
+            timestamp=data.get("timestamp"),
+            seed=data.get("seed"),
+            txHash=data.get("txHash"),
         )
 
 
@@ -1771,19 +1928,19 @@ class Beast:
     @classmethod
     def from_mongo(cls, data):
         return cls(
-            beast=data["beast"],
-            adventurerId=data["adventurerId"],
-            seed=data["seed"],
-            special1=data["special1"],
-            special2=data["special2"],
-            special3=data["special3"],
-            health=data["health"],
-            level=data["level"],
-            tier=data["tier"],
-            slainOnTime=data["slainOnTime"],
-            createdTime=data["createdTime"],
-            lastUpdatedTime=data["lastUpdatedTime"],
-            timestamp=data["timestamp"],
+            beast=data.get("beast"),
+            adventurerId=data.get("adventurerId"),
+            seed=data.get("seed"),
+            special1=data.get("special1"),
+            special2=data.get("special2"),
+            special3=data.get("special3"),
+            health=data.get("health"),
+            level=data.get("level"),
+            tier=data.get("tier"),
+            slainOnTime=data.get("slainOnTime"),
+            createdTime=data.get("createdTime"),
+            lastUpdatedTime=data.get("lastUpdatedTime"),
+            timestamp=data.get("timestamp"),
         )
 
 
@@ -1815,28 +1972,28 @@ class Battle:
     @classmethod
     def from_mongo(cls, data):
         return cls(
-            adventurerId=data["adventurerId"],
-            adventurerHealth=data["adventurerHealth"],
-            beast=data["beast"],
-            beastHealth=data["beastHealth"],
-            beastLevel=data["beastLevel"],
-            special1=data["special1"],
-            special2=data["special2"],
-            special3=data["special3"],
-            seed=data["seed"],
-            attacker=data["attacker"],
-            fled=data["fled"],
-            damageDealt=data["damageDealt"],
-            criticalHit=data["criticalHit"],
-            damageTaken=data["damageTaken"],
-            damageLocation=data["damageLocation"],
-            xpEarnedAdventurer=data["xpEarnedAdventurer"],
-            xpEarnedItems=data["xpEarnedItems"],
-            goldEarned=data["goldEarned"],
-            txHash=data["txHash"],
-            discoveryTime=data["discoveryTime"],
-            blockTime=data["blockTime"],
-            timestamp=data["timestamp"],
+            adventurerId=data.get("adventurerId"),
+            adventurerHealth=data.get("adventurerHealth"),
+            beast=data.get("beast"),
+            beastHealth=data.get("beastHealth"),
+            beastLevel=data.get("beastLevel"),
+            special1=data.get("special1"),
+            special2=data.get("special2"),
+            special3=data.get("special3"),
+            seed=data.get("seed"),
+            attacker=data.get("attacker"),
+            fled=data.get("fled"),
+            damageDealt=data.get("damageDealt"),
+            criticalHit=data.get("criticalHit"),
+            damageTaken=data.get("damageTaken"),
+            damageLocation=data.get("damageLocation"),
+            xpEarnedAdventurer=data.get("xpEarnedAdventurer"),
+            xpEarnedItems=data.get("xpEarnedItems"),
+            goldEarned=data.get("goldEarned"),
+            txHash=data.get("txHash"),
+            discoveryTime=data.get("discoveryTime"),
+            blockTime=data.get("blockTime"),
+            timestamp=data.get("timestamp"),
         )
 
 
@@ -1855,11 +2012,33 @@ class DiscoveryOrBattle:
         return cls(type="Battle", timestamp=battle.timestamp, data=battle)
 
 
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj: Any) -> Any:
-        if isinstance(obj, (Discovery, Battle, DiscoveryOrBattle)):
-            return obj.__dict__
-        return super().default(obj)
+class DiscoveryOrBattleCodec(Codec):
+    # Discoveries and battles are packed as rows of their own type, with the
+    # order they are merged in kept as a list of types
+    def __init__(self):
+        self.discoveries = ObjectListCodec(Discovery)
+        self.battles = ObjectListCodec(Battle)
+
+    def pack(self, items):
+        return [
+            [item.type for item in items],
+            [item.timestamp for item in items],
+            self.discoveries.pack(
+                [item.data for item in items if item.type == "Discovery"]
+            ),
+            self.battles.pack([item.data for item in items if item.type == "Battle"]),
+        ]
+
+    def unpack(self, value):
+        types, timestamps, discoveries, battles = value
+        data = {
+            "Discovery": iter(self.discoveries.unpack(discoveries)),
+            "Battle": iter(self.battles.unpack(battles)),
+        }
+        return [
+            DiscoveryOrBattle(type=type, timestamp=timestamp, data=next(data[type]))
+            for type, timestamp in zip(types, timestamps)
+        ]
 
 
 @strawberry.type
@@ -1884,22 +2063,22 @@ class Item:
     @classmethod
     def from_mongo(cls, data):
         return cls(
-            item=data["item"],
-            adventurerId=data["adventurerId"],
-            ownerAddress=data["ownerAddress"],
-            owner=data["owner"],
-            equipped=data["equipped"],
-            tier=data["tier"],
-            slot=data["slot"],
-            type=data["type"],
-            greatness=data["greatness"],
-            purchasedTime=data["purchasedTime"],
-            special1=data["special1"],
-            special2=data["special2"],
-            special3=data["special3"],
-            xp=data["xp"],
-            isAvailable=data["isAvailable"],
-            timestamp=data["timestamp"],
+            item=data.get("item"),
+            adventurerId=data.get("adventurerId"),
+            ownerAddress=data.get("ownerAddress"),
+            owner=data.get("owner"),
+            equipped=data.get("equipped"),
+            tier=data.get("tier"),
+            slot=data.get("slot"),
+            type=data.get("type"),
+            greatness=data.get("greatness"),
+            purchasedTime=data.get("purchasedTime"),
+            special1=data.get("special1"),
+            special2=data.get("special2"),
+            special3=data.get("special3"),
+            xp=data.get("xp"),
+            isAvailable=data.get("isAvailable"),
+            timestamp=data.get("timestamp"),
         )
 
 
@@ -1911,155 +2090,122 @@ class AdventurerRank:
     total_adventurers: int
 
 
-def get_str_filters(where: StringFilter) -> List[Dict]:
-    filter = {}
-    if where.eq is not None:
-        filter["$eq"] = where.eq
-    if where._in:
-        filter["$in"] = where._in
-    if where.notIn:
-        filter["$nin"] = where.notIn
-    if where.lt is not None:
-        filter["$lt"] = where.lt
-    if where.lte is not None:
-        filter["$lte"] = where.lte
-    if where.gt is not None:
-        filter["$gt"] = where.gt
-    if where.gte is not None:
-        filter["$gte"] = where.gte
-    if where.contains:
-        filter["$regex"] = where.contains
-    if where.startsWith:
-        filter["$regex"] = "^" + where.startsWith
-    if where.endsWith:
-        filter["$regex"] = where.endsWith + "$"
-
-    return filter
+T = TypeVar("T")
 
 
-def get_felt_filters(where: FeltValueFilter) -> List[Dict]:
-    filter = {}
-    if where.eq is not None:
-        filter["$eq"] = where.eq
-    if where._in:
-        filter["$in"] = where._in
-    if where.notIn:
-        filter["$nin"] = where.notIn
-    if where.lt is not None:
-        filter["$lt"] = where.lt
-    if where.lte is not None:
-        filter["$lte"] = where.lte
-    if where.gt is not None:
-        filter["$gt"] = where.gt
-    if where.gte is not None:
-        filter["$gte"] = where.gte
+@strawberry.type
+class PageInfo:
+    hasNextPage: bool
+    endCursor: Optional[str]
 
-    return filter
 
+@strawberry.type
+class Edge(Generic[T]):
+    cursor: str
+    node: T
 
-def get_hex_filters(where: HexValueFilter) -> List[Dict]:
-    filter = {}
-    if where.eq is not None:
-        filter["$eq"] = where.eq
-    if where._in:
-        filter["$in"] = where._in
-    if where.notIn:
-        filter["$nin"] = where.notIn
-    if where.lt is not None:
-        filter["$lt"] = where.lt
-    if where.lte is not None:
-        filter["$lte"] = where.lte
-    if where.gt is not None:
-        filter["$gt"] = where.gt
-    if where.gte is not None:
-        filter["$gte"] = where.gte
 
-    return filter
+@strawberry.type
+class Connection(Generic[T]):
+    edges: List[Edge[T]]
+    pageInfo: PageInfo
+
+
+# GraphQL filter operators and the Mongo operators they translate to, with
+# an optional transform of the operand. Later pattern operators take
+# precedence over earlier ones.
+FILTER_OPERATORS = {
+    "eq": ("$eq", None),
+    "_in": ("$in", None),
+    "notIn": ("$nin", None),
+    "lt": ("$lt", None),
+    "lte": ("$lte", None),
+    "gt": ("$gt", None),
+    "gte": ("$gte", None),
+    "contains": ("$regex", None),
+    "startsWith": ("$regex", lambda value: "^" + value),
+    "endsWith": ("$regex", lambda value: value + "$"),
+}
+
+# Operators ignored when given an empty list or string rather than only null
+SKIP_EMPTY_OPERATORS = {"_in", "notIn", "contains", "startsWith", "endsWith"}
+
+
+@lru_cache(maxsize=None)
+def get_operator_table(cls) -> Tuple:
+    # (attribute, Mongo operator, transform, skip empty) for each operator
+    # the filter input accepts, in FILTER_OPERATORS order
+    annotations = getattr(cls, "__annotations__", {})
+    return tuple(
+        (name, op, transform, name in SKIP_EMPTY_OPERATORS)
+        for name, (op, transform) in FILTER_OPERATORS.items()
+        if name in annotations
+    )
 
 
-def get_date_filters(where: DateTimeFilter) -> List[Dict]:
-    filter = {}
-    if where.eq is not None:
-        filter["$eq"] = where.eq
-    if where._in:
-        filter["$in"] = where._in
-    if where.notIn:
-        filter["$nin"] = where.notIn
-    if where.lt is not None:
-        filter["$lt"] = where.lt
-    if where.lte is not None:
-        filter["$lte"] = where.lte
-    if where.gt is not None:
-        filter["$gt"] = where.gt
-    if where.gte is not None:
-        filter["$gte"] = where.gte
+@lru_cache(maxsize=None)
+def get_filter_table(cls) -> Tuple:
+    """Field -> operator table for a `where` input type.
+
+    Derived once per type from its annotations: every field typed as a
+    filter input (StringFilter, ItemFilter, BooleanFilter, ...) compiles
+    through the operators that input declares.
+    """
+    table = []
+    for key, annotation in cls.__annotations__.items():
+        for arg in get_args(annotation) or (annotation,):
+            operators = get_operator_table(arg)
+            if operators:
+                table.append((key, operators))
+                break
+    return tuple(table)
+
+
+def compile_filter(where, base: Dict) -> Dict:
+    filter = dict(base)
+    if not where:
+        return filter
+
+    for key, operators in get_filter_table(type(where)):
+        value = getattr(where, key)
+        if value is None:
+            continue
+        clause = {}
+        for attr, op, transform, skip_empty in operators:
+            operand = getattr(value, attr)
+            if operand is None or (skip_empty and not operand):
+                continue
+            clause[op] = transform(operand) if transform else operand
+        filter[key] = clause
 
     return filter
 
 
-def get_bool_filters(where: BooleanFilter) -> List[Dict]:
-    filter = {}
-    if where.eq is not None:
-        filter["$eq"] = where.eq
-    return filter
+def get_adventurers_filter(where: Optional[AdventurersFilter]) -> Dict:
+    return compile_filter(where, {"_cursor.to": None})
 
 
-def process_filters(obj, prefix=None):
-    filters = {}
-    for key, value in obj.__dict__.items():
-        if value is not None:
-            filter_key = f"{prefix}.{key}" if prefix else key
-            filters[filter_key] = value
-    return filters
+def get_scores_filter(where: Optional[ScoresFilter]) -> Dict:
+    return compile_filter(where, {"_cursor.to": None})
 
 
-async def get_adventurers(
-    info: Info,
-    where: Optional[AdventurersFilter] = {},
-    limit: Optional[int] = 10,
-    skip: Optional[int] = 0,
-    orderBy: Optional[AdventurersOrderByInput] = {},
-) -> List[Adventurer]:
-    # Enforce the maximum limit
-    if limit is None or limit > MAX_DOCUMENT_LIMIT:
-        limit = MAX_DOCUMENT_LIMIT
+def get_discoveries_filter(where: Optional[DiscoveriesFilter]) -> Dict:
+    return compile_filter(where, {"cursor.to": None})
 
-    db = info.context["db"]
-    redis = info.context["redis"]
 
-    # Convert custom filter objects to dictionaries
-    where_dict = where.to_dict() if where else {}
-    orderBy_dict = orderBy.to_dict() if orderBy else {}
+def get_beasts_filter(where: Optional[BeastsFilter]) -> Dict:
+    return compile_filter(where, {"_cursor.to": None})
 
-    # Create a unique cache key based on the query parameters
-    cache_key = f"adventurers:{json.dumps(where_dict)}:{limit}:{skip}:{json.dumps(orderBy_dict)}"
-    cached_result = await redis.get(cache_key)
 
-    cached_result = await redis.get(cache_key)
-    if cached_result:
-        cached_result = cached_result.decode("utf-8")  # Decode the byte string
-        return [Adventurer.from_mongo(item) for item in json.loads(cached_result)]
+def get_battles_filter(where: Optional[BattlesFilter]) -> Dict:
+    return compile_filter(where, {"_cursor.to": None})
 
-    filter = {"_cursor.to": None}
 
-    if where:
-        processed_filters = process_filters(where)
-        for key, value in processed_filters.items():
-            if (
-                isinstance(value, StringFilter)
-                | isinstance(value, ClassFilter)
-                | isinstance(value, AdventurerStatusFilter)
-            ):
-                filter[key] = get_str_filters(value)
-            elif isinstance(value, HexValueFilter):
-                filter[key] = get_hex_filters(value)
-            elif isinstance(value, DateTimeFilter):
-                filter[key] = get_date_filters(value)
-            elif isinstance(value, FeltValueFilter):
-                filter[key] = get_felt_filters(value)
-            elif isinstance(value, BooleanFilter):
-                filter[key] = get_bool_filters(value)
+def get_items_filter(where: Optional[ItemsFilter]) -> Dict:
+    return compile_filter(where, {"_cursor.to": None})
 
+
+def get_sort_options(orderBy) -> Tuple[str, int]:
     sort_options = {k: v for k, v in orderBy.__dict__.items() if v is not None}
 
     sort_var = "updated_at"
@@ -2079,149 +2225,205 @@ async def get_adventurers(
             sort_dir = -1
             break
 
-    query = (
-        db["adventurers"].find(filter).skip(skip).limit(limit).sort(sort_var, sort_dir)
-    )
+    return sort_var, sort_dir
 
-    result = [Adventurer.from_mongo(t) for t in query]
 
-    # Cache the result
-    await redis.set(cache_key, json.dumps([item.__dict__ for item in result]), ex=60)
+# Stored field each resolved relationship field is looked up by, per type
+RELATED_FIELD_KEYS = {
+    "Adventurer": {
+        "items": "id",
+        "beasts": "id",
+        "battles": "id",
+        "discoveries": "id",
+        "score": "id",
+    },
+}
 
-    return result
 
+def iter_selected_fields(selections, type_name=None):
+    # Expand fragments, skipping those that apply to other union members
+    for selection in selections:
+        if isinstance(selection, SelectedField):
+            yield selection
+        elif type_name is None or selection.type_condition in (None, type_name):
+            yield from iter_selected_fields(selection.selections, type_name)
 
-async def get_scores(
-    info,
-    where: Optional[ScoresFilter] = {},
-    limit: Optional[int] = 10,
-    skip: Optional[int] = 0,
-    orderBy: Optional[ScoresOrderByInput] = {},
-) -> List[Score]:
-    db = info.context["db"]
-    redis = info.context["redis"]
 
-    # Convert custom filter objects to dictionaries
-    where_dict = where.to_dict() if where else {}
-    orderBy_dict = orderBy.to_dict() if orderBy else {}
+def get_projection(info: Info, cls, path=()) -> Dict:
+    """Mongo projection for the fields of `cls` selected in the query.
 
-    # Create a unique cache key based on the query parameters
-    cache_key = (
-        f"scores:{json.dumps(where_dict)}:{limit}:{skip}:{json.dumps(orderBy_dict)}"
+    `path` leads from the resolver's field to the selection of `cls`, e.g.
+    ("edges", "node") for connections.
+    """
+    # A field selected more than once, directly or through fragments, is
+    # merged into one with the selections of all of its nodes
+    selections = [
+        selection for field in info.selected_fields for selection in field.selections
+    ]
+    for name in path:
+        selections = [
+            selection
+            for field in iter_selected_fields(selections)
+            if field.name == name
+            for selection in field.selections
+        ]
+
+    # Output type fields share their names with the stored document; those
+    # with resolvers are computed instead
+    stored = {field.name for field in dataclasses.fields(cls) if field.init}
+    names = {field.name for field in iter_selected_fields(selections, cls.__name__)}
+
+    # Related documents are looked up by a stored field of this one
+    keys = RELATED_FIELD_KEYS.get(cls.__name__, {})
+    names |= {keys[name] for name in names if name in keys}
+
+    # An empty projection would return whole documents
+    return {"_id": 1, **{name: 1 for name in sorted(names & stored)}}
+
+
+async def paginate(
+    collection,
+    filter,
+    sort_var,
+    sort_dir,
+    first,
+    after,
+    from_mongo,
+    projection=None,
+) -> Connection:
+    # Enforce the maximum limit; a limit of 0 would mean none at all
+    if first is None or first > MAX_DOCUMENT_LIMIT:
+        first = MAX_DOCUMENT_LIMIT
+    if first < 1:
+        raise ValueError("first must be at least 1")
+
+    if after:
+        value, _id = decode_cursor(after)
+        filter = {"$and": [filter, get_keyset_filter(sort_var, sort_dir, value, _id)]}
+
+    # The sort field is needed to build cursors
+    if projection is not None:
+        projection = {**projection, sort_var: 1}
+
+    # Fetch one extra document to know whether another page exists
+    docs = await collection.find(
+        filter,
+        projection,
+        sort=[(sort_var, sort_dir), ("_id", sort_dir)],
+        limit=first + 1,
     )
-    cached_result = await redis.get(cache_key)
 
-    if cached_result:
-        cached_result = cached_result.decode("utf-8")  # Decode the byte string
-        return [Score.from_mongo(item) for item in json.loads(cached_result)]
+    edges = [
+        Edge(cursor=encode_cursor(doc.get(sort_var), doc["_id"]), node=from_mongo(doc))
+        for doc in docs[:first]
+    ]
 
-    filter = {"_cursor.to": None}
+    return Connection(
+        edges=edges,
+        pageInfo=PageInfo(
+            hasNextPage=len(docs) > first,
+            endCursor=edges[-1].cursor if edges else None,
+        ),
+    )
 
-    if where:
-        processed_filters = process_filters(where)
-        for key, value in processed_filters.items():
-            if isinstance(value, StringFilter):
-                filter[key] = get_str_filters(value)
-            elif isinstance(value, HexValueFilter):
-                filter[key] = get_hex_filters(value)
-            elif isinstance(value, DateTimeFilter):
-                filter[key] = get_date_filters(value)
-            elif isinstance(value, FeltValueFilter):
-                filter[key] = get_felt_filters(value)
-            elif isinstance(value, U256ValueFilter):
-                filter[key] = get_felt_filters(value)
 
-    sort_options = {k: v for k, v in orderBy.__dict__.items() if v is not None}
+async def find_cached(info: Info, name, cls, filter, sort, skip, limit) -> List:
+    db = info.context["db"]
+    cache = info.context["cache"]
+    loaders = info.context["loaders"]
+
+    projection = get_projection(info, cls)
+
+    # Create a canonical cache key based on the compiled query
+    cache_key = make_cache_key(
+        name,
+        filter=filter,
+        projection=projection,
+        sort=sort,
+        limit=limit,
+        skip=skip,
+    )
 
-    sort_var = "updated_at"
-    sort_dir = -1
+    async def query():
+        docs = await loaders.find(
+            db[name], filter, projection, skip=skip, limit=limit, sort=sort
+        )
 
-    for key, value in sort_options.items():
-        if value.asc:
-            sort_var = key
-            sort_dir = 1
-            break
-        if value.desc:
-            sort_var = key
-            sort_dir = -1
-            break
+        return [cls.from_mongo(t) for t in docs]
 
-    query = db["scores"].find(filter).skip(skip).limit(limit).sort(sort_var, sort_dir)
+    return await cache.get_or_compute(
+        cache_key,
+        query,
+        codec=ObjectListCodec(cls),
+        ex=60,
+        collections=[name],
+    )
 
-    result = [Score.from_mongo(t) for t in query]
 
-    # Cache the result
-    await redis.set(cache_key, json.dumps([item.__dict__ for item in result]), ex=60)
+async def find_adventurer_related(
+    info: Info, name, cls, base, adventurer_id, orderBy, skip, limit
+) -> List:
+    # Enforce the maximum limit, as the parent may list many adventurers
+    if limit is None or limit > MAX_DOCUMENT_LIMIT:
+        limit = MAX_DOCUMENT_LIMIT
 
-    return result
+    # Same query as the top-level field filtered on adventurerId, so both
+    # share cache entries and aliases batch in the same loader
+    filter = {**base, "adventurerId": {"$eq": adventurer_id}}
+    sort_var, sort_dir = get_sort_options(orderBy)
 
+    return await find_cached(
+        info, name, cls, filter, [(sort_var, sort_dir)], skip, limit
+    )
 
-async def get_discoveries(
-    info,
-    where: Optional[DiscoveriesFilter] = {},
+
+async def get_adventurers(
+    info: Info,
+    where: Optional[AdventurersFilter] = {},
     limit: Optional[int] = 10,
     skip: Optional[int] = 0,
-    orderBy: Optional[DiscoveriesOrderByInput] = {},
-) -> List[Discovery]:
-    db = info.context["db"]
-    redis = info.context["redis"]
-
-    # Convert custom filter objects to dictionaries
-    where_dict = where.to_dict() if where else {}
-    orderBy_dict = orderBy.to_dict() if orderBy else {}
-
-    # Create a unique cache key based on the query parameters
-    cache_key = f"discoveries:{json.dumps(where_dict)}:{limit}:{skip}:{json.dumps(orderBy_dict)}"
-    cached_result = await redis.get(cache_key)
-
-    if cached_result:
-        cached_result = cached_result.decode("utf-8")  # Decode the byte string
-        return [Discovery.from_mongo(item) for item in json.loads(cached_result)]
-
-    filter = {"cursor.to": None}
-
-    if where:
-        processed_filters = process_filters(where)
-        for key, value in processed_filters.items():
-            if (
-                isinstance(value, StringFilter)
-                | isinstance(value, DiscoveryFilter)
-                | isinstance(value, SubDiscoveryFilter)
-                | isinstance(value, SlotFilter)
-            ):
-                filter[key] = get_str_filters(value)
-            elif isinstance(value, HexValueFilter):
-                filter[key] = get_hex_filters(value)
-            elif isinstance(value, DateTimeFilter):
-                filter[key] = get_date_filters(value)
-            elif isinstance(value, FeltValueFilter):
-                filter[key] = get_felt_filters(value)
+    orderBy: Optional[AdventurersOrderByInput] = {},
+) -> List[Adventurer]:
+    # Enforce the maximum limit
+    if limit is None or limit > MAX_DOCUMENT_LIMIT:
+        limit = MAX_DOCUMENT_LIMIT
 
-    sort_options = {k: v for k, v in orderBy.__dict__.items() if v is not None}
+    filter = get_adventurers_filter(where)
+    sort_var, sort_dir = get_sort_options(orderBy)
 
-    sort_var = "updated_at"
-    sort_dir = -1
+    return await find_cached(
+        info, "adventurers", Adventurer, filter, [(sort_var, sort_dir)], skip, limit
+    )
 
-    for key, value in sort_options.items():
-        if value.asc:
-            sort_var = key
-            sort_dir = 1
-            break
-        if value.desc:
-            sort_var = key
-            sort_dir = -1
-            break
 
-    query = (
-        db["discoveries"].find(filter).skip(skip).limit(limit).sort(sort_var, sort_dir)
+async def get_scores(
+    info,
+    where: Optional[ScoresFilter] = {},
+    limit: Optional[int] = 10,
+    skip: Optional[int] = 0,
+    orderBy: Optional[ScoresOrderByInput] = {},
+) -> List[Score]:
+    filter = get_scores_filter(where)
+    sort_var, sort_dir = get_sort_options(orderBy)
+
+    return await find_cached(
+        info, "scores", Score, filter, [(sort_var, sort_dir)], skip, limit
     )
 
-    result = [Discovery.from_mongo(t) for t in query]
 
-    # Cache the result
-    await redis.set(cache_key, json.dumps([item.__dict__ for item in result]), ex=60)
+async def get_discoveries(
+    info,
+    where: Optional[DiscoveriesFilter] = {},
+    limit: Optional[int] = 10,
+    skip: Optional[int] = 0,
+    orderBy: Optional[DiscoveriesOrderByInput] = {},
+) -> List[Discovery]:
+    filter = get_discoveries_filter(where)
+    sort_var, sort_dir = get_sort_options(orderBy)
 
-    return result
+    return await find_cached(
+        info, "discoveries", Discovery, filter, [(sort_var, sort_dir)], skip, limit
+    )
 
 
 async def get_beasts(
@@ -2231,66 +2433,12 @@ async def get_beasts(
     skip: Optional[int] = 0,
     orderBy: Optional[BeastsOrderByInput] = {},
 ) -> List[Discovery]:
-    db = info.context["db"]
-    redis = info.context["redis"]
-
-    # Convert custom filter objects to dictionaries
-    where_dict = where.to_dict() if where else {}
-    orderBy_dict = orderBy.to_dict() if orderBy else {}
+    filter = get_beasts_filter(where)
+    sort_var, sort_dir = get_sort_options(orderBy)
 
-    # Create a unique cache key based on the query parameters
-    cache_key = (
-        f"beasts:{json.dumps(where_dict)}:{limit}:{skip}:{json.dumps(orderBy_dict)}"
+    return await find_cached(
+        info, "beasts", Beast, filter, [(sort_var, sort_dir)], skip, limit
     )
-    cached_result = await redis.get(cache_key)
-
-    if cached_result:
-        cached_result = cached_result.decode("utf-8")  # Decode the byte string
-        return [Beast.from_mongo(item) for item in json.loads(cached_result)]
-
-    filter = {"_cursor.to": None}
-
-    if where:
-        processed_filters = process_filters(where)
-        for key, value in processed_filters.items():
-            if (
-                isinstance(value, StringFilter)
-                | isinstance(value, BeastFilter)
-                | isinstance(value, Special1Filter)
-                | isinstance(value, Special2Filter)
-                | isinstance(value, Special3Filter)
-            ):
-                filter[key] = get_str_filters(value)
-            elif isinstance(value, HexValueFilter):
-                filter[key] = get_hex_filters(value)
-            elif isinstance(value, DateTimeFilter):
-                filter[key] = get_date_filters(value)
-            elif isinstance(value, FeltValueFilter):
-                filter[key] = get_felt_filters(value)
-
-    sort_options = {k: v for k, v in orderBy.__dict__.items() if v is not None}
-
-    sort_var = "updated_at"
-    sort_dir = -1
-
-    for key, value in sort_options.items():
-        if value.asc:
-            sort_var = key
-            sort_dir = 1
-            break
-        if value.desc:
-            sort_var = key
-            sort_dir = -1
-            break
-
-    query = db["beasts"].find(filter).skip(skip).limit(limit).sort(sort_var, sort_dir)
-
-    result = [Beast.from_mongo(t) for t in query]
-
-    # Cache the result
-    await redis.set(cache_key, json.dumps([item.__dict__ for item in result]), ex=60)
-
-    return result
 
 
 async def get_battles(
@@ -2300,127 +2448,177 @@ async def get_battles(
     skip: Optional[int] = 0,
     orderBy: Optional[BattlesOrderByInput] = {},
 ) -> List[Battle]:
-    db = info.context["db"]
-    redis = info.context["redis"]
+    filter = get_battles_filter(where)
+    sort_var, sort_dir = get_sort_options(orderBy)
 
-    # Convert custom filter objects to dictionaries
-    where_dict = where.to_dict() if where else {}
-    orderBy_dict = orderBy.to_dict() if orderBy else {}
-
-    # Create a unique cache key based on the query parameters
-    cache_key = (
-        f"battles:{json.dumps(where_dict)}:{limit}:{skip}:{json.dumps(orderBy_dict)}"
+    return await find_cached(
+        info, "battles", Battle, filter, [(sort_var, sort_dir)], skip, limit
     )
-    cached_result = await redis.get(cache_key)
-
-    if cached_result:
-        cached_result = cached_result.decode("utf-8")  # Decode the byte string
-        return [Battle.from_mongo(item) for item in json.loads(cached_result)]
 
-    filter = {"_cursor.to": None}
 
-    if where:
-        processed_filters = process_filters(where)
-        for key, value in processed_filters.items():
-            if isinstance(value, StringFilter) | isinstance(value, AttackerFilter):
-                filter[key] = get_str_filters(value)
-            elif isinstance(value, HexValueFilter):
-                filter[key] = get_hex_filters(value)
-            elif isinstance(value, DateTimeFilter):
-                filter[key] = get_date_filters(value)
-            elif isinstance(value, FeltValueFilter):
-                filter[key] = get_felt_filters(value)
-            elif isinstance(value, BooleanFilter):
-                filter[key] = get_bool_filters(value)
+async def get_items(
+    info,
+    where: Optional[ItemsFilter] = {},
+    limit: Optional[int] = 10,
+    skip: Optional[int] = 0,
+    orderBy: Optional[ItemsOrderByInput] = {},
+) -> List[Item]:
+    filter = get_items_filter(where)
+    sort_var, sort_dir = get_sort_options(orderBy)
 
-    sort_options = {k: v for k, v in orderBy.__dict__.items() if v is not None}
+    return await find_cached(
+        info, "items", Item, filter, [(sort_var, sort_dir)], skip, limit
+    )
 
-    sort_var = "updated_at"
-    sort_dir = -1
 
-    for key, value in sort_options.items():
-        if value.asc:
-            sort_var = key
-            sort_dir = 1
-            break
-        if value.desc:
-            sort_var = key
-            sort_dir = -1
-            break
+async def get_adventurers_connection(
+    info,
+    where: Optional[AdventurersFilter] = {},
+    first: Optional[int] = 10,
+    after: Optional[str] = None,
+    orderBy: Optional[AdventurersOrderByInput] = {},
+) -> Connection[Adventurer]:
+    db = info.context["db"]
 
-    query = db["battles"].find(filter).skip(skip).limit(limit).sort(sort_var, sort_dir)
+    filter = get_adventurers_filter(where)
+    sort_var, sort_dir = get_sort_options(orderBy)
+    projection = get_projection(info, Adventurer, path=("edges", "node"))
+
+    return await paginate(
+        db["adventurers"],
+        filter,
+        sort_var,
+        sort_dir,
+        first,
+        after,
+        Adventurer.from_mongo,
+        projection=projection,
+    )
 
-    result = [Battle.from_mongo(t) for t in query]
 
-    # Cache the result
-    await redis.set(cache_key, json.dumps([item.__dict__ for item in result]), ex=60)
+async def get_scores_connection(
+    info,
+    where: Optional[ScoresFilter] = {},
+    first: Optional[int] = 10,
+    after: Optional[str] = None,
+    orderBy: Optional[ScoresOrderByInput] = {},
+) -> Connection[Score]:
+    db = info.context["db"]
 
-    return result
+    filter = get_scores_filter(where)
+    sort_var, sort_dir = get_sort_options(orderBy)
+    projection = get_projection(info, Score, path=("edges", "node"))
+
+    return await paginate(
+        db["scores"],
+        filter,
+        sort_var,
+        sort_dir,
+        first,
+        after,
+        Score.from_mongo,
+        projection=projection,
+    )
 
 
-async def get_items(
+async def get_discoveries_connection(
     info,
-    where: Optional[ItemsFilter] = {},
-    limit: Optional[int] = 10,
-    skip: Optional[int] = 0,
-    orderBy: Optional[ItemsOrderByInput] = {},
-) -> List[Item]:
+    where: Optional[DiscoveriesFilter] = {},
+    first: Optional[int] = 10,
+    after: Optional[str] = None,
+    orderBy: Optional[DiscoveriesOrderByInput] = {},
+) -> Connection[Discovery]:
     db = info.context["db"]
-    redis = info.context["redis"]
-
-    # Convert custom filter objects to dictionaries
-    where_dict = where.to_dict() if where else {}
-    orderBy_dict = orderBy.to_dict() if orderBy else {}
 
-    # Create a unique cache key based on the query parameters
-    cache_key = (
-        f"items:{json.dumps(where_dict)}:{limit}:{skip}:{json.dumps(orderBy_dict)}"
+    filter = get_discoveries_filter(where)
+    sort_var, sort_dir = get_sort_options(orderBy)
+    projection = get_projection(info, Discovery, path=("edges", "node"))
+
+    return await paginate(
+        db["discoveries"],
+        filter,
+        sort_var,
+        sort_dir,
+        first,
+        after,
+        Discovery.from_mongo,
+        projection=projection,
     )
-    cached_result = await redis.get(cache_key)
 
-    if cached_result:
-        cached_result = cached_result.decode("utf-8")  # Decode the byte string
-        return [Item.from_mongo(item) for item in json.loads(cached_result)]
 
-    filter = {"_cursor.to": None}
+async def get_beasts_connection(
+    info,
+    where: Optional[BeastsFilter] = {},
+    first: Optional[int] = 10,
+    after: Optional[str] = None,
+    orderBy: Optional[BeastsOrderByInput] = {},
+) -> Connection[Beast]:
+    db = info.context["db"]
 
-    if where:
-        processed_filters = process_filters(where)
-        for key, value in processed_filters.items():
-            if isinstance(value, StringFilter):
-                filter[key] = get_str_filters(value)
-            elif isinstance(value, HexValueFilter):
-                filter[key] = get_hex_filters(value)
-            elif isinstance(value, DateTimeFilter):
-                filter[key] = get_date_filters(value)
-            elif isinstance(value, FeltValueFilter):
-                filter[key] = get_felt_filters(value)
-            elif isinstance(value, BooleanFilter):
-                filter[key] = get_bool_filters(value)
+    filter = get_beasts_filter(where)
+    sort_var, sort_dir = get_sort_options(orderBy)
+    projection = get_projection(info, Beast, path=("edges", "node"))
+
+    return await paginate(
+        db["beasts"],
+        filter,
+        sort_var,
+        sort_dir,
+        first,
+        after,
+        Beast.from_mongo,
+        projection=projection,
+    )
 
-    sort_options = {k: v for k, v in orderBy.__dict__.items() if v is not None}
 
-    sort_var = "updated_at"
-    sort_dir = -1
-
-    for key, value in sort_options.items():
-        if value.asc:
-            sort_var = key
-            sort_dir = 1
-            break
-        if value.desc:
-            sort_var = key
-            sort_dir = -1
-            break
+async def get_battles_connection(
+    info,
+    where: Optional[BattlesFilter] = {},
+    first: Optional[int] = 10,
+    after: Optional[str] = None,
+    orderBy: Optional[BattlesOrderByInput] = {},
+) -> Connection[Battle]:
+    db = info.context["db"]
 
-    query = db["items"].find(filter).skip(skip).limit(limit).sort(sort_var, sort_dir)
+    filter = get_battles_filter(where)
+    sort_var, sort_dir = get_sort_options(orderBy)
+    projection = get_projection(info, Battle, path=("edges", "node"))
+
+    return await paginate(
+        db["battles"],
+        filter,
+        sort_var,
+        sort_dir,
+        first,
+        after,
+        Battle.from_mongo,
+        projection=projection,
+    )
 
-    result = [Item.from_mongo(t) for t in query]
 
-    # Cache the result
-    await redis.set(cache_key, json.dumps([item.__dict__ for item in result]), ex=60)
+async def get_items_connection(
+    info,
+    where: Optional[ItemsFilter] = {},
+    first: Optional[int] = 10,
+    after: Optional[str] = None,
+    orderBy: Optional[ItemsOrderByInput] = {},
+) -> Connection[Item]:
+    db = info.context["db"]
 
-    return result
+    filter = get_items_filter(where)
+    sort_var, sort_dir = get_sort_options(orderBy)
+    projection = get_projection(info, Item, path=("edges", "node"))
+
+    return await paginate(
+        db["items"],
+        filter,
+        sort_var,
+        sort_dir,
+        first,
+        after,
+        Item.from_mongo,
+        projection=projection,
+    )
 
 
 async def get_discoveries_and_battles(
@@ -2429,19 +2627,85 @@ async def get_discoveries_and_battles(
     limit: int = 10,
     skip: int = 0,
 ) -> List[DiscoveryOrBattle]:
+    # Enforce the maximum limit
+    if limit is None or limit > MAX_DOCUMENT_LIMIT:
+        limit = MAX_DOCUMENT_LIMIT
+
     db = info.context["db"]
-    redis = info.context["redis"]
+    cache = info.context["cache"]
+
+    filter = compile_filter(where, {"_cursor.to": None})
+
+    # Each source projects the fields selected on its member of the union,
+    # plus the timestamp both are merged on
+    discoveries_projection = {
+        **get_projection(info, Discovery, path=("data",)),
+        "timestamp": 1,
+    }
+    battles_projection = {
+        **get_projection(info, Battle, path=("data",)),
+        "timestamp": 1,
+    }
+
+    # Create a canonical cache key based on the compiled query
+    cache_key = make_cache_key(
+        "discoveries_and_battles",
+        filter=filter,
+        projection=[discoveries_projection, battles_projection],
+        limit=limit,
+        skip=skip,
+    )
 
-    # Convert custom filter objects to dictionaries
-    where_dict = where.to_dict() if where else {}
+    async def query():
+        # Each source only needs its newest skip + limit documents, since that
+        # is the most either can contribute to the requested page
+        window = skip + limit
+
+        # Pipeline for discoveries
+        discoveries_pipeline = [
+            {"$match": filter},
+            {"$sort": {"timestamp": -1}},
+            {"$limit": window},
+            {"$project": discoveries_projection},
+            {
+                "$project": {
+                    "_id": 0,
+                    "type": {"$literal": "Discovery"},
+                    "timestamp": 1,
+                    "data": "$$ROOT",
+                }
+            },
+        ]
 
-    # Create a unique cache key based on the query parameters
-    cache_key = f"discoveries_and_battles:{json.dumps(where_dict)}:{limit}:{skip}"
-    cached_result = await redis.get(cache_key)
+        # Pipeline for battles
+        battles_pipeline = [
+            {"$match": filter},
+            {"$sort": {"timestamp": -1}},
+            {"$limit": window},
+            {"$project": battles_projection},
+            {
+                "$project": {
+                    "_id": 0,
+                    "type": {"$literal": "Battle"},
+                    "timestamp": 1,
+                    "data": "$$ROOT",
+                }
+            },
+        ]
 
-    if cached_result:
-        cached_result = cached_result.decode("utf-8")  # Decode the byte string
-        deserialized = json.loads(cached_result)
+        # Run aggregations
+        discoveries, battles = await asyncio.gather(
+            db["discoveries"].aggregate(discoveries_pipeline),
+            db["battles"].aggregate(battles_pipeline),
+        )
+
+        # Lazily merge the two timestamp-sorted sources and apply skip and limit
+        merged = heapq.merge(
+            discoveries, battles, key=lambda x: x["timestamp"], reverse=True
+        )
+        paginated = islice(merged, skip, window)
+
+        # Convert the result to DiscoveryOrBattle objects
         return [
             DiscoveryOrBattle(
                 type=item["type"],
@@ -2452,99 +2716,49 @@ async def get_discoveries_and_battles(
                     else Battle.from_mongo(item["data"])
                 ),
             )
-            for item in deserialized
+            for item in paginated
         ]
 
-    filter = {"_cursor.to": None}
-
-    if where:
-        processed_filters = process_filters(where)
-        for key, value in processed_filters.items():
-            if isinstance(value, StringFilter):
-                filter[key] = get_str_filters(value)
-            elif isinstance(value, HexValueFilter):
-                filter[key] = get_hex_filters(value)
-            elif isinstance(value, DateTimeFilter):
-                filter[key] = get_date_filters(value)
-            elif isinstance(value, FeltValueFilter):
-                filter[key] = get_felt_filters(value)
-            elif isinstance(value, BooleanFilter):
-                filter[key] = get_bool_filters(value)
-
-    # Pipeline for discoveries
-    discoveries_pipeline = [
-        {"$match": filter},
-        {"$addFields": {"type": "Discovery"}},
-        {"$project": {"_id": 0, "type": 1, "timestamp": 1, "data": "$$ROOT"}},
-        {"$sort": {"timestamp": -1}},
-    ]
-
-    # Pipeline for battles
-    battles_pipeline = [
-        {"$match": filter},
-        {"$addFields": {"type": "Battle"}},
-        {"$project": {"_id": 0, "type": 1, "timestamp": 1, "data": "$$ROOT"}},
-        {"$sort": {"timestamp": -1}},
-    ]
-
-    # Run aggregations
-    discoveries = list(db["discoveries"].aggregate(discoveries_pipeline))
-    battles = list(db["battles"].aggregate(battles_pipeline))
-
-    # Combine and sort results
-    combined = sorted(discoveries + battles, key=lambda x: x["timestamp"], reverse=True)
-
-    # Apply skip and limit
-    paginated = combined[skip : skip + limit]
-
-    # Convert the result to DiscoveryOrBattle objects
-    converted_result = [
-        DiscoveryOrBattle(
-            type=item["type"],
-            timestamp=item["timestamp"],
-            data=(
-                Discovery.from_mongo(item["data"])
-                if item["type"] == "Discovery"
-                else Battle.from_mongo(item["data"])
-            ),
-        )
-        for item in paginated
-    ]
-
-    # Cache the result
-    await redis.set(
+    return await cache.get_or_compute(
         cache_key,
-        json.dumps(converted_result, cls=CustomJSONEncoder),
+        query,
+        codec=DiscoveryOrBattleCodec(),
         ex=60,
+        collections=["discoveries", "battles"],
     )
 
-    return converted_result
-
 
 async def count_adventurers_with_zero_health(info) -> int:
-    redis = info.context["redis"]
-    cache_key = "count_adventurers_with_zero_health"
+    db = info.context["db"]
+    cache = info.context["cache"]
+    counters = info.context.get("counters")
 
-    # Check if the result is in the cache
-    cached_count = await redis.get(cache_key)
-    if cached_count is not None:
-        return int(cached_count)
+    # Serve from the materialized counters once they have been built
+    if counters is not None and counters.ready:
+        return await counters.count(DEAD)
 
-    # If not in cache, query the database
-    db = info.context["db"]
-    filter = {"_cursor.to": None}
-    count = db["adventurers"].count_documents({**filter, "health": {"$eq": 0}})
+    cache_key = "count_adventurers_with_zero_health"
 
-    # Store the result in the cache
-    await redis.set(cache_key, count, ex=60)  # Set an expiration time of 60 seconds
+    async def query():
+        filter = {"_cursor.to": None}
+        return await db["adventurers"].count_documents({**filter, "health": {"$eq": 0}})
 
-    return count
+    # Fresh for 60 seconds, or until new blocks are indexed
+    return await cache.get_or_compute(
+        cache_key, query, codec=IntCodec(), ex=60, collections=["adventurers"]
+    )
 
 
 async def count_adventurers_with_positive_health(
     info, owner: Optional[HexValue] = None
 ) -> int:
-    redis = info.context["redis"]
+    db = info.context["db"]
+    cache = info.context["cache"]
+    counters = info.context.get("counters")
+
+    # Serve from the materialized counters once they have been built
+    if counters is not None and counters.ready:
+        return await counters.count(ALIVE, owner)
 
     filter = {"_cursor.to": None}
 
@@ -2552,25 +2766,25 @@ async def count_adventurers_with_positive_health(
     if owner:
         filter["owner"] = {"$eq": owner}
 
-    cache_key = f"count_adventurers_with_positive_health:{json.dumps(filter)}"
+    cache_key = make_cache_key("count_adventurers_with_positive_health", filter=filter)
 
-    # Check if the result is in the cache
-    cached_count = await redis.get(cache_key)
-    if cached_count is not None:
-        return int(cached_count)
-
-    # If not in cache, query the database
-    db = info.context["db"]
-    count = db["adventurers"].count_documents({**filter, "health": {"$gt": 0}})
+    async def query():
+        return await db["adventurers"].count_documents({**filter, "health": {"$gt": 0}})
 
-    # Store the result in the cache
-    await redis.set(cache_key, count, ex=60)  # Set an expiration time of 60 seconds
-
-    return count
+    # Fresh for 60 seconds, or until new blocks are indexed
+    return await cache.get_or_compute(
+        cache_key, query, codec=IntCodec(), ex=60, collections=["adventurers"]
+    )
 
 
 async def count_total_adventurers(info, owner: Optional[HexValue] = None) -> int:
-    redis = info.context["redis"]
+    db = info.context["db"]
+    cache = info.context["cache"]
+    counters = info.context.get("counters")
+
+    # Serve from the materialized counters once they have been built
+    if counters is not None and counters.ready:
+        return await counters.count(TOTAL, owner)
 
     filter = {"_cursor.to": None}
 
@@ -2578,113 +2792,118 @@ async def count_total_adventurers(info, owner: Optional[HexValue] = None) -> int
     if owner:
         filter["owner"] = {"$eq": owner}
 
-    cache_key = f"count_total_adventurers:{json.dumps(filter)}"
+    cache_key = make_cache_key("count_total_adventurers", filter=filter)
 
-    # Check if the result is in the cache
-    cached_count = await redis.get(cache_key)
-    if cached_count is not None:
-        return int(cached_count)
+    async def query():
+        return await db["adventurers"].count_documents({**filter})
 
-    # If not in cache, query the database
-    db = info.context["db"]
-    count = db["adventurers"].count_documents({**filter})
-
-    # Store the result in the cache
-    await redis.set(cache_key, count, ex=60)  # Set an expiration time of 60 seconds
-
-    return count
+    # Fresh for 60 seconds, or until new blocks are indexed
+    return await cache.get_or_compute(
+        cache_key, query, codec=IntCodec(), ex=60, collections=["adventurers"]
+    )
 
 
 async def count_total_discoveries_and_battles(
     info, adventurerId: Optional[int] = None
 ) -> int:
-    redis = info.context["redis"]
-    # If not in cache, query the database
     db = info.context["db"]
+    cache = info.context["cache"]
     filter = {"_cursor.to": None}
 
     # Add adventurerId to the filter if provided
     if adventurerId:
         filter["adventurerId"] = {"$eq": adventurerId}
 
-    cache_key = f"count_total_discoveries_and_battles:{json.dumps(filter)}"
-
-    # Check if the result is in the cache
-    cached_count = await redis.get(cache_key)
-    if cached_count is not None:
-        return int(cached_count)
+    cache_key = make_cache_key("count_total_discoveries_and_battles", filter=filter)
 
-    discoveries_count = db["discoveries"].count_documents({**filter})
-    battles_count = db["battles"].count_documents({**filter})
-
-    total_count = discoveries_count + battles_count
-
-    # Store the result in the cache
-    await redis.set(
-        cache_key, total_count, ex=60
-    )  # Set an expiration time of 60 seconds
+    async def query():
+        discoveries_count, battles_count = await asyncio.gather(
+            db["discoveries"].count_documents({**filter}),
+            db["battles"].count_documents({**filter}),
+        )
+        return discoveries_count + battles_count
 
-    return total_count
+    # Fresh for 60 seconds, or until new blocks are indexed
+    return await cache.get_or_compute(
+        cache_key,
+        query,
+        codec=IntCodec(),
+        ex=60,
+        collections=["discoveries", "battles"],
+    )
 
 
 async def get_adventurer_rank(
     info, adventurer_id: int, adventurer_xp: int
 ) -> Optional[AdventurerRank]:
     db = info.context["db"]
-    redis = info.context["redis"]
+    cache = info.context["cache"]
+    rank_index = info.context.get("rank_index")
+
+    # Serve from the leaderboard index once it has been built
+    if rank_index is not None and rank_index.ready:
+        rank, total = await rank_index.rank(adventurer_xp)
+        return AdventurerRank(
+            adventurer_id=adventurer_id,
+            xp=adventurer_xp,
+            rank=rank,
+            # Matches the aggregation below when there are no dead adventurers
+            total_adventurers=max(total, 1),
+        )
 
-    # Try to get the rank from cache
     cache_key = f"adventurer_rank:{adventurer_id}"
-    cached_rank = await redis.get(cache_key)
-    if cached_rank:
-        return AdventurerRank(**json.loads(cached_rank))
-
-    # If not in cache, calculate the rank
-    pipeline = [
-        {
-            "$match": {
-                "_cursor.to": None,  # Only consider current adventurers
-                "health": 0,  # Filter adventurers with health equal 0
-            }
-        },
-        {
-            "$group": {
-                "_id": None,
-                "total": {"$sum": 1},
-                "rank": {"$sum": {"$cond": [{"$gt": ["$xp", adventurer_xp]}, 1, 0]}},
-            }
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "adventurer_id": {"$literal": adventurer_id},
-                "xp": {"$literal": adventurer_xp},
-                "rank": {"$add": ["$rank", 1]},  # Add 1 because rank is 1-indexed
-                "total_adventurers": "$total",
-            }
-        },
-    ]
 
-    result = list(db["adventurers"].aggregate(pipeline))
+    async def query():
+        # Calculate the rank
+        pipeline = [
+            {
+                "$match": {
+                    "_cursor.to": None,  # Only consider current adventurers
+                    "health": 0,  # Filter adventurers with health equal 0
+                }
+            },
+            {
+                "$group": {
+                    "_id": None,
+                    "total": {"$sum": 1},
+                    "rank": {
+                        "$sum": {"$cond": [{"$gt": ["$xp", adventurer_xp]}, 1, 0]}
+                    },
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "adventurer_id": {"$literal": adventurer_id},
+                    "xp": {"$literal": adventurer_xp},
+                    "rank": {"$add": ["$rank", 1]},  # Add 1 because rank is 1-indexed
+                    "total_adventurers": "$total",
+                }
+            },
+        ]
 
-    if not result:
-        # If no result, it means there are no adventurers with 0 health
-        # In this case, we'll return a rank of 1 out of 1
-        rank_data = {
-            "adventurer_id": adventurer_id,
-            "xp": adventurer_xp,
-            "rank": 1,
-            "total_adventurers": 1,
-        }
-    else:
-        rank_data = result[0]
+        result = await db["adventurers"].aggregate(pipeline)
 
-    adventurer_rank = AdventurerRank(**rank_data)
+        if not result:
+            # If no result, it means there are no adventurers with 0 health
+            # In this case, we'll return a rank of 1 out of 1
+            rank_data = {
+                "adventurer_id": adventurer_id,
+                "xp": adventurer_xp,
+                "rank": 1,
+                "total_adventurers": 1,
+            }
+        else:
+            rank_data = result[0]
 
-    # Cache the result
-    await redis.set(cache_key, json.dumps(rank_data), ex=300)  # Cache for 5 minutes
+        return rank_data
 
-    return adventurer_rank
+    # Cache for 5 minutes, or until new blocks are indexed
+    rank_data = await cache.get_or_compute(
+        cache_key, query, codec=JSONCodec(), ex=300, collections=["adventurers"]
+    )
+
+    return AdventurerRank(**rank_data)
 
 
 @strawberry.type
@@ -2698,6 +2917,22 @@ class Query:
         resolver=get_discoveries_and_battles
     )
     items: List[Item] = strawberry.field(resolver=get_items)
+    adventurersConnection: Connection[Adventurer] = strawberry.field(
+        resolver=get_adventurers_connection
+    )
+    scoresConnection: Connection[Score] = strawberry.field(
+        resolver=get_scores_connection
+    )
+    beastsConnection: Connection[Beast] = strawberry.field(
+        resolver=get_beasts_connection
+    )
+    discoveriesConnection: Connection[Discovery] = strawberry.field(
+        resolver=get_discoveries_connection
+    )
+    battlesConnection: Connection[Battle] = strawberry.field(
+        resolver=get_battles_connection
+    )
+    itemsConnection: Connection[Item] = strawberry.field(resolver=get_items_connection)
     countDeadAdventurers: int = strawberry.field(
         resolver=count_adventurers_with_zero_health
     )
@@ -2714,37 +2949,150 @@ class Query:
 
 
 class IndexerGraphQLView(GraphQLView):
-    def __init__(self, db, redis, api_key, **kwargs):
+    def __init__(
+        self,
+        db,
+        redis,
+        api_key,
+        cache,
+        rank_index=None,
+        counters=None,
+        persisted_queries=None,
+        blocks=None,
+        **kwargs,
+    ):
         super().__init__(**kwargs)
+        # Handlers are created per request, resolving persisted query hashes
+        # and answering conditional GETs against the indexed block heights
+        self.http_handler_class = partial(
+            IndexerHTTPHandler, persisted_queries=persisted_queries, blocks=blocks
+        )
         self._db = db
         self._redis = redis
         self._api_key = api_key
+        self._cache = cache
+        self._rank_index = rank_index
+        self._counters = counters
 
     async def get_context(self, request, _response):
         # api_key = request.headers.get("X-API-Key")
         # if api_key != self._api_key:
         #     raise web.HTTPUnauthorized(reason="Invalid API Key")
 
-        return {"db": self._db, "redis": self._redis, "max_limit": MAX_DOCUMENT_LIMIT}
+        # Batch lookups made by the resolvers of this request
+        cache = request["cache"] = self._cache.batched()
+        return {
+            "db": self._db,
+            "redis": self._redis,
+            "cache": cache,
+            "loaders": Loaders(self._db),
+            "rank_index": self._rank_index,
+            "counters": self._counters,
+            "max_limit": MAX_DOCUMENT_LIMIT,
+        }
+
+    async def process_result(self, request, result):
+        # Lets the handler keep responses with errors out of HTTP caches
+        request["graphql_errors"] = bool(result.errors)
+        REDIS_ROUND_TRIPS.observe(request["cache"].round_trips)
+        return await super().process_result(request, result)
 
 
 async def run_graphql_api(
     mongo=None,
     redis_url="redis://redis",
+    redis_pool_size=DEFAULT_REDIS_POOL_SIZE,
+    redis_pool_timeout=DEFAULT_REDIS_POOL_TIMEOUT,
+    redis_timeout=DEFAULT_REDIS_TIMEOUT,
+    redis_connect_timeout=DEFAULT_REDIS_CONNECT_TIMEOUT,
+    redis_keepalive=True,
+    redis_health_check_interval=DEFAULT_REDIS_HEALTH_CHECK_INTERVAL,
     port="8080",
     allowed_origins=["http://localhost:3000"],
     api_key=None,
+    mongo_pool_size=DEFAULT_POOL_SIZE,
+    mongo_timeout=DEFAULT_QUERY_TIMEOUT,
+    cache_lock=True,
+    cache_stale_ttl=STALE_TTL,
+    local_cache_bytes=LOCAL_MAX_BYTES,
+    query_metrics=False,
+    slow_query_ms=SLOW_QUERY_MS,
+    explain_sample_rate=EXPLAIN_SAMPLE_RATE,
+    reuse_port=False,
+    metrics_port=None,
+    maintain_views=True,
 ):
-    mongo = MongoClient(mongo)
+    # Per-resolver Mongo instrumentation is opt-in
+    instrumentation = None
+    if query_metrics:
+        instrumentation = QueryInstrumentation(
+            slow_query_ms=slow_query_ms, explain_sample_rate=explain_sample_rate
+        )
+
     db_name = "mongo".replace("-", "_")
-    db = mongo[db_name]
+    db = AsyncDatabase(
+        mongo,
+        db_name,
+        pool_size=mongo_pool_size,
+        query_timeout=mongo_timeout,
+        instrumentation=instrumentation,
+    )
 
-    redis = await aioredis.from_url(redis_url)
+    # Bounded pool, so bursts queue for a connection rather than open more
+    redis = connect_redis(
+        redis_url,
+        pool_size=redis_pool_size,
+        pool_timeout=redis_pool_timeout,
+        timeout=redis_timeout,
+        connect_timeout=redis_connect_timeout,
+        keepalive=redis_keepalive,
+        health_check_interval=redis_health_check_interval,
+    )
+
+    # Report event loop lag on /metrics
+    tasks = [asyncio.create_task(monitor_event_loop())]
+
+    # Version cached results by the latest indexed block of each collection
+    blocks = BlockTracker(db)
+    tasks.append(asyncio.create_task(blocks.run()))
+    # Keep the hottest results decoded in process, in front of Redis
+    local = LocalCache(max_bytes=local_cache_bytes) if local_cache_bytes else None
+    cache = QueryCache(
+        redis,
+        distributed_lock=cache_lock,
+        stale_ttl=cache_stale_ttl,
+        blocks=blocks,
+        local=local,
+    )
 
-    schema = strawberry.Schema(query=Query)
-    view = IndexerGraphQLView(db, redis, api_key, schema=schema)
+    # Build the leaderboard index and adventurer counters in the background
+    # and keep them in sync
+    rank_index = RankIndex(db, redis)
+    counters = AdventurerCounters(db, redis)
+    for materialized in (rank_index, counters):
+        if maintain_views:
+            tasks.append(asyncio.create_task(materialized.run()))
+        else:
+            tasks.append(asyncio.create_task(materialized.wait_until_built()))
+
+    # Repeated documents skip parsing and validation
+    schema = strawberry.Schema(
+        query=Query,
+        extensions=[GraphQLMetrics, DocumentCache()],
+    )
+    view = IndexerGraphQLView(
+        db,
+        redis,
+        api_key,
+        cache,
+        rank_index=rank_index,
+        counters=counters,
+        persisted_queries=PersistedQueries(redis),
+        blocks=blocks,
+        schema=schema,
+    )
 
-    app = web.Application()
+    app = web.Application(middlewares=[metrics_middleware])
 
     # Setup CORS with the specific origin
     cors = aiohttp_cors.setup(
@@ -2764,6 +3112,14 @@ async def run_graphql_api(
     cors.add(resource.add_route("POST", view))
     cors.add(resource.add_route("GET", view))
 
+    # Metrics are per process, so with a port of their own every scrape
+    # reads the same worker
+    metrics_runner = None
+    if metrics_port is None:
+        app.router.add_get("/metrics", metrics_handler)
+    else:
+        metrics_runner = await serve_metrics(metrics_port)
+
     runner = web.AppRunner(app)
     await runner.setup()
 
@@ -2775,10 +3131,127 @@ async def run_graphql_api(
     # )
     # site = web.TCPSite(runner, "0.0.0.0", int(port), ssl_context=ssl_context)
 
-    site = web.TCPSite(runner, "0.0.0.0", int(port))
+    site = web.TCPSite(runner, "0.0.0.0", int(port), reuse_port=reuse_port)
     await site.start()
 
     print(f"GraphQL server started on port {port}")
 
-    while True:
-        await asyncio.sleep(5_000)
+    # Run until asked to stop, then drain in-flight requests before exiting
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    await runner.cleanup()
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+    for task in tasks:
+        task.cancel()
+    # Views hand their maintainer lease back as they stop
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await redis.close()
+    await redis.connection_pool.disconnect()
+    db.close()
+
+
+def run_graphql_worker(kwargs):
+    # Workers handle their own shutdown, so undo the supervisor's handlers
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    asyncio.run(run_graphql_api(**kwargs))
+
+
+def serve_graphql_api(workers=1, metrics_port=None, **kwargs):
+    """Run the GraphQL server in `workers` processes sharing one port.
+
+    Each worker opens its own Mongo and Redis pools and the kernel balances
+    connections between them through SO_REUSEPORT. Workers that die are
+    replaced; SIGINT/SIGTERM are forwarded so every worker drains before
+    the supervisor exits. Workers failing right after starting, e.g. on
+    an unreachable database or a taken port, are restarted with a growing
+    delay, and after `WORKER_MAX_STARTUP_FAILURES` failures in a row the
+    supervisor stops the others and exits.
+
+    A single process serves /metrics on `metrics_port`, or on the API port
+    if unset. Worker N serves its own on `metrics_port` + N, from
+    `DEFAULT_METRICS_PORT` if unset, so each is scraped as its own target.
+    """
+    if workers <= 1:
+        asyncio.run(run_graphql_api(metrics_port=metrics_port, **kwargs))
+        return
+
+    if metrics_port is None:
+        metrics_port = DEFAULT_METRICS_PORT
+
+    def start(index):
+        process = multiprocessing.Process(
+            target=run_graphql_worker,
+            args=(
+                {
+                    **kwargs,
+                    "reuse_port": True,
+                    # One worker per replica competes for the lease on the
+                    # shared views; the others only wait for them to be built
+                    "maintain_views": index == 0,
+                    "metrics_port": metrics_port + index,
+                },
+            ),
+            name=f"graphql-worker-{index}",
+        )
+        process.start()
+        return process
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    processes = [start(i) for i in range(workers)]
+    started = [time.monotonic()] * workers
+    failures = [0] * workers
+    restart_at = [None] * workers
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    gave_up = False
+    while not stopping:
+        now = time.monotonic()
+        for i, process in enumerate(processes):
+            if process.is_alive() or stopping:
+                continue
+            if restart_at[i] is None:
+                if now - started[i] < WORKER_STARTUP_GRACE:
+                    failures[i] += 1
+                else:
+                    failures[i] = 0
+                if failures[i] >= WORKER_MAX_STARTUP_FAILURES:
+                    logger.error(
+                        f"{process.name} failed to start {failures[i]} times "
+                        f"in a row, stopping"
+                    )
+                    gave_up = True
+                    stop(None, None)
+                    break
+                delay = min(
+                    WORKER_RESTART_DELAY * 2 ** failures[i], WORKER_MAX_RESTART_DELAY
+                )
+                logger.warning(
+                    f"{process.name} exited with code {process.exitcode}, "
+                    f"restarting in {delay}s"
+                )
+                restart_at[i] = now + delay
+            elif now >= restart_at[i]:
+                processes[i] = start(i)
+                started[i] = now
+                restart_at[i] = None
+        time.sleep(WORKER_POLL_INTERVAL)
+
+    for process in processes:
+        process.join()
+    if gave_up:
+        raise SystemExit(1)
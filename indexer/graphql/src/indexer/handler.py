@@ -0,0 +1,158 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+from aiohttp import web
+from graphql import FieldNode, GraphQLError, OperationDefinitionNode, parse
+from strawberry.aiohttp.handlers import HTTPHandler
+
+from indexer.blocks import COLLECTIONS
+from indexer.documents import DOCUMENT_CACHE_SIZE
+from indexer.persisted import PersistedQueryError
+
+# Seconds a GET response may be reused without revalidation, by root field;
+# an operation gets the smallest max-age of the fields it queries
+DEFAULT_MAX_AGE = 2
+MAX_AGE = {
+    # Aggregates over every adventurer barely move with one block
+    "countDeadAdventurers": 30,
+    "countAliveAdventurers": 30,
+    "countTotalAdventurers": 30,
+    "countDiscoveriesAndBattles": 30,
+    "adventurerRank": 10,
+}
+
+
+# Max-age of recent operations, keyed by a hash rather than the query text
+# so memory stays bounded however long the queries
+max_ages = OrderedDict()
+
+
+def get_max_age(query, operation_name):
+    # None for anything but a valid query operation
+    key = hashlib.blake2b(
+        json.dumps([query, operation_name]).encode(), digest_size=16
+    ).digest()
+    if key in max_ages:
+        max_ages.move_to_end(key)
+        return max_ages[key]
+
+    max_age = max_ages[key] = parse_max_age(query, operation_name)
+    if len(max_ages) > DOCUMENT_CACHE_SIZE:
+        max_ages.popitem(last=False)
+    return max_age
+
+
+def parse_max_age(query, operation_name):
+    try:
+        document = parse(query, no_location=True)
+    except GraphQLError:
+        return None
+
+    operations = [
+        definition
+        for definition in document.definitions
+        if isinstance(definition, OperationDefinitionNode)
+        and (
+            operation_name is None
+            or getattr(definition.name, "value", None) == operation_name
+        )
+    ]
+    if len(operations) != 1 or operations[0].operation.value != "query":
+        return None
+
+    # Root fragments may select anything, so they get the default
+    return min(
+        (
+            MAX_AGE.get(selection.name.value, DEFAULT_MAX_AGE)
+            if isinstance(selection, FieldNode)
+            else DEFAULT_MAX_AGE
+            for selection in operations[0].selection_set.selections
+        ),
+        default=DEFAULT_MAX_AGE,
+    )
+
+
+def get_etag(request_data, version):
+    fingerprint = json.dumps(
+        [
+            request_data.query,
+            request_data.variables,
+            request_data.operation_name,
+            version,
+        ],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return '"' + hashlib.blake2b(fingerprint.encode(), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    # If-None-Match compares weakly and may list several tags. "*" is not
+    # honoured, as a client holding no response must not get a 304
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.replace("W/", "", 1) == etag for tag in tags)
+
+
+class IndexerHTTPHandler(HTTPHandler):
+    """HTTP handler adding persisted queries and HTTP caching.
+
+    Persisted query hashes are resolved to their text before executing.
+    GET queries get a `Cache-Control` max-age and, while indexed block
+    heights are known, an ETag from the operation and those heights, so a
+    matching `If-None-Match` is answered 304 without running resolvers.
+    """
+
+    def __init__(self, *args, persisted_queries=None, blocks=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.persisted_queries = persisted_queries
+        self.blocks = blocks
+        self.body = {}
+
+    async def parse_body(self, request):
+        # Keep the body for its `extensions`, which strawberry drops
+        self.body = await super().parse_body(request)
+        return self.body
+
+    async def execute_request(self, request, request_data, method):
+        if self.persisted_queries is not None:
+            try:
+                request_data.query = await self.persisted_queries.resolve(
+                    request_data.query, self.get_extensions(request, method)
+                )
+            except PersistedQueryError as e:
+                # Clients expect these as GraphQL errors to know to retry
+                return web.json_response(
+                    {"errors": [{"message": e.message, "extensions": {"code": e.code}}]}
+                )
+
+        if method != "GET" or request_data.query is None:
+            return await super().execute_request(request, request_data, method)
+
+        max_age = get_max_age(request_data.query, request_data.operation_name)
+        if max_age is None:
+            return await super().execute_request(request, request_data, method)
+
+        headers = {"Cache-Control": f"public, max-age={max_age}"}
+        version = self.blocks.version(COLLECTIONS) if self.blocks else None
+        if version is not None:
+            headers["ETag"] = get_etag(request_data, version)
+            if etag_matches(request.headers.get("If-None-Match"), headers["ETag"]):
+                return web.Response(status=304, headers=headers)
+
+        response = await super().execute_request(request, request_data, method)
+        # Responses with errors are not cached
+        if not request.get("graphql_errors"):
+            response.headers.update(headers)
+        return response
+
+    def get_extensions(self, request, method):
+        if method != "GET":
+            return self.body.get("extensions")
+        try:
+            return json.loads(request.query.get("extensions", "null"))
+        except json.JSONDecodeError:
+            raise web.HTTPBadRequest(reason="Unable to parse extensions as JSON")
@@ -0,0 +1,258 @@
+from collections import Counter
+
+from pymongo import MongoClient
+
+from indexer.graphql import (
+    AdventurersFilter,
+    AdventurersOrderByInput,
+    BattlesFilter,
+    BattlesOrderByInput,
+    BeastsFilter,
+    BeastsOrderByInput,
+    DiscoveriesFilter,
+    DiscoveriesOrderByInput,
+    ItemsFilter,
+    ItemsOrderByInput,
+    ScoresFilter,
+    ScoresOrderByInput,
+)
+
+# Where and orderBy inputs of each collection; only their fields are indexed
+INPUT_TYPES = {
+    "adventurers": (AdventurersFilter, AdventurersOrderByInput),
+    "battles": (BattlesFilter, BattlesOrderByInput),
+    "beasts": (BeastsFilter, BeastsOrderByInput),
+    "discoveries": (DiscoveriesFilter, DiscoveriesOrderByInput),
+    "items": (ItemsFilter, ItemsOrderByInput),
+    "scores": (ScoresFilter, ScoresOrderByInput),
+}
+
+# Fields the resolvers and background tasks query on their own
+INTERNAL_FIELDS = {"_id", "_cursor.from", "_cursor.to", "cursor.to"}
+
+# Operators that pin a field to one or a few values
+EQUALITY_OPERATORS = {"$eq", "$in"}
+
+# Every list resolver sorts on this unless given an orderBy
+DEFAULT_SORT = [("updated_at", -1), ("_id", -1)]
+
+CURRENT = {"_cursor.to": None}
+
+# Query shapes issued on hot paths (mostly by the UI), in the compiled form
+# the resolvers send. Values are placeholders, only operators matter.
+BASELINE_SHAPES = {
+    "adventurers": [
+        ({**CURRENT}, DEFAULT_SORT),
+        ({**CURRENT, "id": {"$in": []}}, DEFAULT_SORT),
+        ({**CURRENT, "owner": {"$eq": ""}, "health": {"$gte": 0}}, [("id", 1)]),
+        ({**CURRENT, "owner": {"$eq": ""}, "health": {"$gt": 0}}, None),
+        ({**CURRENT, "health": {"$eq": 0}}, [("xp", -1)]),
+        ({**CURRENT, "health": {"$nin": [0]}}, [("xp", -1)]),
+    ],
+    "battles": [
+        ({**CURRENT}, DEFAULT_SORT),
+        ({**CURRENT, "adventurerId": {"$eq": 0}}, [("timestamp", -1)]),
+    ],
+    "beasts": [
+        ({**CURRENT}, DEFAULT_SORT),
+        ({**CURRENT, "adventurerId": {"$eq": 0}, "beast": {"$eq": 0}}, DEFAULT_SORT),
+        ({**CURRENT, "health": {"$eq": 0}, "tier": {"$eq": 0}}, [("level", -1)]),
+    ],
+    "discoveries": [
+        ({"cursor.to": None}, DEFAULT_SORT),
+        ({"cursor.to": None, "adventurerId": {"$eq": 0}}, [("timestamp", -1)]),
+        # discoveriesAndBattles
+        ({**CURRENT, "adventurerId": {"$eq": 0}}, [("timestamp", -1)]),
+    ],
+    "items": [
+        ({**CURRENT}, DEFAULT_SORT),
+        ({**CURRENT, "adventurerId": {"$eq": 0}, "owner": {"$eq": True}}, DEFAULT_SORT),
+        (
+            {**CURRENT, "adventurerId": {"$eq": 0}, "isAvailable": {"$eq": True}},
+            DEFAULT_SORT,
+        ),
+    ],
+    "scores": [
+        ({**CURRENT}, DEFAULT_SORT),
+        ({**CURRENT, "adventurerId": {"$in": []}}, DEFAULT_SORT),
+    ],
+}
+
+# Most recent profiled operations to sample
+PROFILE_LIMIT = 10_000
+
+# Observed shapes seen fewer times than this are not worth an index
+MIN_OBSERVED = 3
+
+
+def get_indexable_fields(collection):
+    fields = set(INTERNAL_FIELDS)
+    for input_type in INPUT_TYPES[collection]:
+        fields.update(input_type.__annotations__)
+    return fields
+
+
+def get_plain_filters(filter):
+    # Yield the field conditions of a filter, looking through $and but not
+    # $or, whose branches (keyset pagination) an index prefix cannot serve
+    for key, value in filter.items():
+        if key == "$and":
+            for clause in value:
+                yield from get_plain_filters(clause)
+        elif not key.startswith("$"):
+            yield key, value
+
+
+def shape_to_index(collection, filter, sort):
+    """Index keys for a query shape following the ESR rule.
+
+    Fields compared for equality come first, then the sort fields, then
+    fields with range conditions, so one index both narrows and orders the
+    scan. Returns None if the shape touches fields the API cannot query.
+    """
+    fields = get_indexable_fields(collection)
+    equality, ranges = [], []
+    for key, value in get_plain_filters(filter):
+        if key not in fields:
+            return None
+        is_equality = not isinstance(value, dict) or set(value) <= EQUALITY_OPERATORS
+        (equality if is_equality else ranges).append(key)
+
+    keys = [(key, 1) for key in equality]
+    for key, direction in sort or []:
+        if key not in fields and key != "updated_at":
+            return None
+        keys.append((key, direction))
+    keys += [(key, 1) for key in ranges]
+
+    # Keep the first position of any repeated field
+    seen = set()
+    index = []
+    for key, direction in keys:
+        if key not in seen:
+            seen.add(key)
+            index.append((key, direction))
+    return tuple(index), len(set(equality))
+
+
+def covers(existing, required, equality_count):
+    """Whether the `existing` index keys can serve the `required` ones."""
+    if len(existing) < len(required):
+        return False
+
+    # Equality fields may come in any order and direction
+    head = {key for key, _ in existing[:equality_count]}
+    if head != {key for key, _ in required[:equality_count]}:
+        return False
+
+    # The rest must match as a prefix, possibly scanned in reverse
+    rest = existing[equality_count : len(required)]
+    wanted = required[equality_count:]
+    reverse = [(key, -direction) for key, direction in wanted]
+    return list(rest) == list(wanted) or list(rest) == reverse
+
+
+def get_observed_shapes(db, limit=PROFILE_LIMIT):
+    """(collection, filter, sort) of queries recorded by the Mongo profiler.
+
+    Requires profiling to be enabled, e.g. db.setProfilingLevel(1, 50).
+    """
+    entries = (
+        db["system.profile"]
+        .find({"ns": {"$regex": f"^{db.name}\\."}}, {"command": 1}, sort=[("ts", -1)])
+        .limit(limit)
+    )
+
+    for entry in entries:
+        command = entry.get("command", {})
+        if "find" in command:
+            sort = list(command.get("sort", {}).items())
+            yield command["find"], command.get("filter", {}), sort
+        elif "count" in command:
+            yield command["count"], command.get("query", {}), None
+        elif "aggregate" in command:
+            # Only a leading $match and $sort can use an index
+            stages = command.get("pipeline", [])[:2]
+            filter = next((s["$match"] for s in stages if "$match" in s), {})
+            sort = next((list(s["$sort"].items()) for s in stages if "$sort" in s), [])
+            yield command["aggregate"], filter, sort
+
+
+def plan_indexes(db, profile_limit=PROFILE_LIMIT, min_observed=MIN_OBSERVED):
+    """Indexes missing for the baseline and frequently observed query shapes.
+
+    Returns {collection: [(keys, reason)]}, dropping shapes already served
+    by a live index or by a wider index earlier in the plan.
+    """
+    required = {}
+    for collection, shapes in BASELINE_SHAPES.items():
+        for filter, sort in shapes:
+            shape = shape_to_index(collection, filter, sort)
+            if shape:
+                required.setdefault(collection, {}).setdefault(shape, "baseline")
+
+    observed = Counter()
+    for collection, filter, sort in get_observed_shapes(db, profile_limit):
+        if collection in INPUT_TYPES:
+            shape = shape_to_index(collection, filter, sort)
+            if shape:
+                observed[collection, shape] += 1
+    for (collection, shape), count in observed.most_common():
+        if count >= min_observed:
+            reason = f"observed {count} times"
+            required.setdefault(collection, {}).setdefault(shape, reason)
+
+    plan = {}
+    for collection, shapes in required.items():
+        # Text and geo indexes have string directions and never match
+        existing = [
+            tuple(
+                (key, direction if isinstance(direction, str) else int(direction))
+                for key, direction in info["key"]
+            )
+            for info in db[collection].index_information().values()
+        ]
+        missing = []
+        # Longest first so narrower shapes can ride on a planned index
+        for (keys, equality_count), reason in sorted(
+            shapes.items(), key=lambda item: -len(item[0][0])
+        ):
+            served = existing + [planned for planned, _ in missing]
+            if not any(covers(index, keys, equality_count) for index in served):
+                missing.append((keys, reason))
+        if missing:
+            plan[collection] = missing
+    return plan
+
+
+def apply_indexes(db, plan):
+    for collection, indexes in plan.items():
+        for keys, _ in indexes:
+            db[collection].create_index(list(keys))
+
+
+def format_index(keys):
+    return "{" + ", ".join(f"{key}: {direction}" for key, direction in keys) + "}"
+
+
+def run_indexes(mongo, apply=False, profile_limit=PROFILE_LIMIT):
+    client = MongoClient(mongo)
+    db_name = "mongo".replace("-", "_")
+    db = client[db_name]
+
+    try:
+        plan = plan_indexes(db, profile_limit)
+        if not plan:
+            print("All query shapes are index-backed")
+            return
+
+        for collection, indexes in plan.items():
+            for keys, reason in indexes:
+                print(f"{collection}: {format_index(keys)} ({reason})")
+
+        if apply:
+            apply_indexes(db, plan)
+            count = sum(len(indexes) for indexes in plan.values())
+            print(f"Created {count} indexes")
+    finally:
+        client.close()
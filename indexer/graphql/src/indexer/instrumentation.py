@@ -0,0 +1,195 @@
+import asyncio
+import contextvars
+import logging
+import random
+import time
+
+from bson import json_util
+from strawberry.extensions import SchemaExtension
+from strawberry.utils.await_maybe import await_maybe
+
+from prometheus_client import REGISTRY, Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Queries slower than this (milliseconds) are logged with their filter
+SLOW_QUERY_MS = 500
+
+# Fraction of queries re-run through explain to count documents examined
+EXPLAIN_SAMPLE_RATE = 0.01
+
+# Top-level GraphQL field being resolved, for attributing Mongo queries
+current_resolver = contextvars.ContextVar("current_resolver", default="background")
+
+
+# Distinct operation names labelled before the rest are grouped as "other"
+MAX_OPERATION_LABELS = 200
+
+OPERATION_DURATION = Histogram(
+    "graphql_operation_duration_seconds",
+    "GraphQL operation latency.",
+    ("operation", "status"),
+)
+RESOLVER_DURATION = Histogram(
+    "graphql_resolver_duration_seconds",
+    "Latency of top-level GraphQL fields.",
+    ("resolver",),
+)
+
+
+class GraphQLMetrics(SchemaExtension):
+    """Times operations and top-level fields.
+
+    The field being resolved is also kept in `current_resolver` so Mongo
+    queries can be attributed to it.
+    """
+
+    operations = set()
+
+    def on_operation(self):
+        start = time.perf_counter()
+        yield
+        context = self.execution_context
+        status = "error" if context.errors else "ok"
+        OPERATION_DURATION.labels(
+            operation=self._operation_label(context.operation_name), status=status
+        ).observe(time.perf_counter() - start)
+
+    def _operation_label(self, name):
+        # Operation names come from clients, so bound how many become labels
+        name = name or "anonymous"
+        if name not in self.operations:
+            if len(self.operations) >= MAX_OPERATION_LABELS:
+                return "other"
+            self.operations.add(name)
+        return name
+
+    def resolve(self, _next, root, info, *args, **kwargs):
+        # Nested fields are plain attribute lookups, leave them synchronous
+        if info.path.prev is not None:
+            return _next(root, info, *args, **kwargs)
+        return self._resolve_root(_next, root, info, *args, **kwargs)
+
+    async def _resolve_root(self, _next, root, info, *args, **kwargs):
+        token = current_resolver.set(info.field_name)
+        start = time.perf_counter()
+        try:
+            return await await_maybe(_next(root, info, *args, **kwargs))
+        finally:
+            RESOLVER_DURATION.labels(resolver=info.field_name).observe(
+                time.perf_counter() - start
+            )
+            current_resolver.reset(token)
+
+
+def iter_values(doc, key):
+    # Every value stored under `key` anywhere in a nested explain document
+    if isinstance(doc, dict):
+        for k, v in doc.items():
+            if k == key:
+                yield v
+            yield from iter_values(v, key)
+    elif isinstance(doc, list):
+        for item in doc:
+            yield from iter_values(item, key)
+
+
+class QueryInstrumentation:
+    """Per-resolver Mongo latency, explain sampling and slow-query logging.
+
+    Every query is timed and attributed to the resolver that issued it. A
+    sample of them is explained in the background to compare documents
+    examined with documents returned and to count collection scans.
+    """
+
+    def __init__(
+        self,
+        slow_query_ms=SLOW_QUERY_MS,
+        explain_sample_rate=EXPLAIN_SAMPLE_RATE,
+        registry=REGISTRY,
+    ):
+        self._slow_query_ms = slow_query_ms
+        self._explain_sample_rate = explain_sample_rate
+        self._explains = set()
+
+        labels = ("resolver", "collection")
+        self.duration = Histogram(
+            "mongo_query_duration_seconds",
+            "Mongo query latency.",
+            labels + ("operation",),
+            registry=registry,
+        )
+        self.returned = Counter(
+            "mongo_documents_returned_total",
+            "Documents returned by Mongo.",
+            labels,
+            registry=registry,
+        )
+        self.slow = Counter(
+            "mongo_slow_queries_total",
+            "Mongo queries over the slow threshold.",
+            labels,
+            registry=registry,
+        )
+        self.explained = Counter(
+            "mongo_explained_queries_total",
+            "Mongo queries sampled for explain.",
+            labels,
+            registry=registry,
+        )
+        self.explain_examined = Counter(
+            "mongo_explain_documents_examined_total",
+            "Documents examined by explained queries.",
+            labels,
+            registry=registry,
+        )
+        self.explain_returned = Counter(
+            "mongo_explain_documents_returned_total",
+            "Documents returned by explained queries.",
+            labels,
+            registry=registry,
+        )
+        self.collscans = Counter(
+            "mongo_explain_collscans_total",
+            "Explained queries that scanned a whole collection.",
+            labels,
+            registry=registry,
+        )
+
+    def observe(self, db, collection, operation, command, duration, returned):
+        resolver = current_resolver.get()
+        labels = {"resolver": resolver, "collection": collection.name}
+        self.duration.labels(operation=operation, **labels).observe(duration)
+        self.returned.labels(**labels).inc(returned)
+
+        if duration * 1000 >= self._slow_query_ms:
+            self.slow.labels(**labels).inc()
+            logger.warning(
+                f"Slow {operation} on {collection.name} from {resolver} "
+                f"({duration * 1000:.0f}ms): {json_util.dumps(command)}"
+            )
+
+        if random.random() < self._explain_sample_rate:
+            task = asyncio.create_task(self._explain(db, collection, command, labels))
+            # Hold a reference until the explain is done
+            self._explains.add(task)
+            task.add_done_callback(self._explains.discard)
+
+    async def _explain(self, db, collection, command, labels):
+        def run():
+            return collection.database.command(
+                {"explain": command, "verbosity": "executionStats"}
+            )
+
+        try:
+            result = await db.run(run)
+        except Exception:
+            logger.exception(f"Failed to explain query on {collection.name}")
+            return
+
+        stats = next(iter_values(result, "executionStats"), {})
+        self.explained.labels(**labels).inc()
+        self.explain_examined.labels(**labels).inc(stats.get("totalDocsExamined", 0))
+        self.explain_returned.labels(**labels).inc(stats.get("nReturned", 0))
+        if "COLLSCAN" in iter_values(result, "stage"):
+            self.collscans.labels(**labels).inc()
@@ -0,0 +1,89 @@
+import logging
+import time
+import uuid
+
+from indexer.materialized import BUILD_TIMEOUT, MaterializedView
+
+logger = logging.getLogger(__name__)
+
+# Sorted set of dead adventurers, member = adventurer id, score = xp
+LEADERBOARD_KEY = "leaderboard:dead_adventurers"
+
+ZADD_BATCH_SIZE = 10_000
+
+
+class RankIndex(MaterializedView):
+    """Leaderboard rank index kept in a Redis sorted set.
+
+    The set is rebuilt from Mongo at startup and then updated incrementally
+    from adventurer versions whose `_cursor.from` is at or after the last
+    block seen, so a rank lookup is a ZCOUNT/ZCARD pair instead of a scan.
+    """
+
+    collection = "adventurers"
+    key = LEADERBOARD_KEY
+
+    async def build(self):
+        # Read the head first so the following sync replays anything written
+        # while the snapshot was taken; replaying updates is idempotent
+        last_block = await self._latest_block()
+        docs = await self._db["adventurers"].find(
+            {"_cursor.to": None, "health": 0},
+            {"_id": 0, "id": 1, "xp": 1},
+            timeout=BUILD_TIMEOUT,
+        )
+
+        # Versions still being indexed may lack the xp they are ranked by
+        docs = [doc for doc in docs if doc.get("xp") is not None]
+
+        # Build into a scratch key of this build's own, so concurrent builds
+        # cannot fill each other's, and swap it in atomically
+        scratch_key = f"{self._key}:build:{uuid.uuid4().hex}"
+        pipe = self._redis.pipeline(transaction=False)
+        for i in range(0, len(docs), ZADD_BATCH_SIZE):
+            batch = docs[i : i + ZADD_BATCH_SIZE]
+            pipe.zadd(scratch_key, {str(doc["id"]): doc["xp"] for doc in batch})
+        if docs:
+            pipe.rename(scratch_key, self._key)
+        else:
+            pipe.delete(self._key)
+        self._mark_built(pipe)
+        try:
+            await pipe.execute()
+        except Exception:
+            await self._redis.delete(scratch_key)
+            raise
+
+        self._last_block = last_block
+        self._last_build = time.monotonic()
+        self.ready = True
+        logger.info(f"Built leaderboard index with {len(docs)} adventurers")
+
+    async def sync(self):
+        docs = await self._changed_since_last_block(
+            {"_id": 0, "id": 1, "xp": 1, "health": 1}
+        )
+        if not docs:
+            return
+
+        pipe = self._redis.pipeline(transaction=False)
+        for doc in docs:
+            health, xp = doc.get("health"), doc.get("xp")
+            # Partial versions are skipped rather than stall every later sync
+            if health is None or (health == 0 and xp is None):
+                continue
+            if health == 0:
+                pipe.zadd(self._key, {str(doc["id"]): xp})
+            else:
+                pipe.zrem(self._key, str(doc["id"]))
+        await pipe.execute()
+
+        self._last_block = max(doc["_cursor"]["from"] for doc in docs)
+
+    async def rank(self, xp):
+        # Rank is 1 + the number of dead adventurers with strictly more xp
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.zcount(self._key, f"({xp}", "+inf")
+        pipe.zcard(self._key)
+        higher, total = await pipe.execute()
+        return higher + 1, total
@@ -0,0 +1,150 @@
+import json
+
+from strawberry.dataloader import DataLoader
+
+# Field each collection is most often looked up by, one value per alias
+BATCH_FIELDS = {
+    "adventurers": "id",
+    "scores": "adventurerId",
+    "discoveries": "adventurerId",
+    "beasts": "adventurerId",
+    "battles": "adventurerId",
+    "items": "adventurerId",
+}
+
+# Fields matching at most one current document per value
+UNIQUE_FIELDS = {
+    "adventurers": "id",
+}
+
+# Field the position of each document within its value's page is kept in
+RANK_FIELD = "_rank"
+
+
+def get_batch_value(filter, field):
+    # The value `filter` narrows `field` to with a plain equality, if any
+    condition = filter.get(field)
+    if isinstance(condition, dict) and list(condition) == ["$eq"]:
+        return True, condition["$eq"]
+    return False, None
+
+
+def is_current(filter):
+    # Whether `filter` only matches the latest version of each document
+    return "_cursor.to" in filter and filter["_cursor.to"] is None
+
+
+def project_field(projection, field):
+    # `projection` amended to return `field`, and whether that changed it
+    if projection is None:
+        return None, False
+    if any(value for name, value in projection.items() if name != "_id"):
+        if projection.get(field):
+            return projection, False
+        return {**projection, field: 1}, True
+    if field in projection:
+        return {k: v for k, v in projection.items() if k != field}, True
+    return projection, False
+
+
+def group_pages(docs, field, added, values):
+    # Documents split by their `field` value into one list per value, in
+    # order, dropping `field` if it was only fetched to tell them apart
+    pages = {}
+    for doc in docs:
+        value = doc.pop(field) if added else doc[field]
+        pages.setdefault(repr(value), []).append(doc)
+    return [pages.get(repr(value), []) for value in values]
+
+
+class Loaders:
+    """DataLoaders for one GraphQL request.
+
+    Queries that differ only in the value they look `BATCH_FIELDS` up by,
+    such as one `items` alias per adventurer, are collected over a tick of
+    the event loop. Lookups of current documents by a unique field run as
+    a single `$in` query, which returns at most one document per value.
+    Others run as a single `$in` aggregation that numbers the documents of
+    each value in sort order, so each page keeps its own skip and limit.
+    """
+
+    def __init__(self, db):
+        self._db = db
+        self._loaders = {}
+
+    async def find(self, collection, filter, projection, sort, skip=0, limit=0):
+        field = BATCH_FIELDS.get(collection.name)
+        batchable, value = get_batch_value(filter, field) if field else (False, None)
+        if not batchable:
+            return await collection.find(
+                filter, projection, sort=sort, skip=skip, limit=limit
+            )
+
+        # Queries of the same shape share a loader
+        rest = {k: v for k, v in filter.items() if k != field}
+        shape = json.dumps(
+            [collection.name, field, rest, projection, sort, skip, limit],
+            sort_keys=True,
+            default=str,
+        )
+        loader = self._loaders.get(shape)
+        if loader is None:
+
+            async def load(values):
+                return await self._find_many(
+                    collection, field, values, rest, projection, sort, skip, limit
+                )
+
+            loader = self._loaders[shape] = DataLoader(load_fn=load, cache_key_fn=repr)
+        return await loader.load(value)
+
+    async def _find_many(
+        self, collection, field, values, filter, projection, sort, skip, limit
+    ):
+        if len(values) == 1:
+            docs = await collection.find(
+                {**filter, field: {"$eq": values[0]}},
+                projection,
+                sort=sort,
+                skip=skip,
+                limit=limit,
+            )
+            return [docs]
+
+        # Documents are told apart by `field`, which the caller may not have
+        # asked for
+        amended, added = project_field(projection, field)
+
+        if UNIQUE_FIELDS.get(collection.name) == field and is_current(filter):
+            docs = await collection.find(
+                {**filter, field: {"$in": list(values)}}, amended, sort=sort
+            )
+            end = skip + limit if limit else None
+            pages = group_pages(docs, field, added, values)
+            return [page[skip:end] for page in pages]
+
+        if amended is None or not any(amended.get(k) for k in amended if k != "_id"):
+            # Not an inclusion projection, so the rank has to be excluded
+            amended = {**(amended or {}), RANK_FIELD: 0}
+
+        # Break ties on _id so pages are stable
+        sort_by = dict(sort or [])
+        sort_by.setdefault("_id", 1)
+        rank = {"$gt": skip}
+        if limit:
+            rank["$lte"] = skip + limit
+        docs = await collection.aggregate(
+            [
+                {"$match": {**filter, field: {"$in": list(values)}}},
+                {
+                    "$setWindowFields": {
+                        "partitionBy": f"${field}",
+                        "sortBy": sort_by,
+                        "output": {RANK_FIELD: {"$documentNumber": {}}},
+                    }
+                },
+                {"$match": {RANK_FIELD: rank}},
+                {"$project": amended},
+            ]
+        )
+        return group_pages(docs, field, added, values)
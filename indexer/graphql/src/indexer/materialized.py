@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+import uuid
+
+from indexer.cache import RELEASE_LOCK_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+# How often to pull versions written since the last sync
+SYNC_INTERVAL = 5
+
+# Full rebuilds pick up anything incremental syncs cannot see (e.g. reorgs)
+REBUILD_INTERVAL = 3600
+
+# Rebuilding scans a whole collection, so allow it more than a request gets
+BUILD_TIMEOUT = 300
+
+# Seconds a maintainer's lease on a view lasts unless renewed, so another
+# process takes over within this long of the maintainer going away
+MAINTAINER_LEASE = 30
+
+# Takes the lease for the caller, or extends it if the caller holds it
+ACQUIRE_LEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+if redis.call("set", KEYS[1], ARGV[1], "NX", "EX", ARGV[2]) then
+    return 1
+end
+return 0
+"""
+
+
+class MaterializedView:
+    """Redis view of a Mongo collection kept up to date by block.
+
+    Subclasses set `collection` and a default `key`, and implement
+    `build()`, which recomputes the view from scratch, and `sync()`, which
+    applies versions whose `_cursor.from` is at or after `_last_block`.
+    Processes sharing the Redis instance may all `run()` the view: the one
+    holding its `{key}:maintainer` lease maintains it, and the others only
+    follow its builds, as processes using `wait_until_built()` do. Only one
+    process ever builds or syncs a view at a time.
+
+    A view can legitimately be empty, which Redis stores as no key at all,
+    so builds also write `version` to a `{key}:built` marker. Bump
+    `version` when the layout changes so readers wait for a compatible
+    build.
+    """
+
+    collection = None
+    key = None
+    sync_interval = SYNC_INTERVAL
+    lease = MAINTAINER_LEASE
+    version = 1
+
+    def __init__(self, db, redis, key=None):
+        self._db = db
+        self._redis = redis
+        self._key = key or self.key
+        self._built_key = f"{self._key}:built"
+        self._lease_key = f"{self._key}:maintainer"
+        self._token = uuid.uuid4().hex
+        self._last_block = None
+        self._last_build = 0
+        self.ready = False
+
+    async def _latest_block(self):
+        doc = await self._db[self.collection].find_one(
+            {}, {"_cursor.from": 1}, sort=[("_cursor.from", -1)]
+        )
+        return doc["_cursor"]["from"] if doc else 0
+
+    async def _changed_since_last_block(self, projection):
+        return await self._db[self.collection].find(
+            {"_cursor.from": {"$gte": self._last_block}, "_cursor.to": None},
+            {**projection, "_cursor.from": 1},
+        )
+
+    def _mark_built(self, pipe):
+        # Queue the marker in the pipeline that swaps a build in
+        pipe.set(self._built_key, self.version)
+
+    async def build(self):
+        raise NotImplementedError
+
+    async def sync(self):
+        raise NotImplementedError
+
+    async def _hold_lease(self):
+        # Whether this process maintains the view until the lease runs out
+        held = await self._redis.eval(
+            ACQUIRE_LEASE_SCRIPT, 1, self._lease_key, self._token, self.lease
+        )
+        return bool(held)
+
+    async def _renew_lease(self):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                await self._hold_lease()
+            except Exception:
+                logger.exception(f"Failed to renew the lease on {self._key}")
+
+    async def _update(self, rebuild_interval):
+        # Builds may outlast the lease, so keep renewing it meanwhile
+        renewal = asyncio.create_task(self._renew_lease())
+        try:
+            if (
+                self._last_block is None
+                or time.monotonic() - self._last_build > rebuild_interval
+            ):
+                await self.build()
+            else:
+                await self.sync()
+        finally:
+            renewal.cancel()
+
+    async def _check_built(self):
+        built = await self._redis.get(self._built_key)
+        self.ready = built is not None and int(built) == self.version
+
+    async def run(self, interval=None, rebuild_interval=REBUILD_INTERVAL):
+        interval = interval or self.sync_interval
+        try:
+            while True:
+                try:
+                    if await self._hold_lease():
+                        await self._update(rebuild_interval)
+                    else:
+                        # Should this process take over, it starts from a build
+                        self._last_block = None
+                        await self._check_built()
+                except Exception:
+                    logger.exception(f"Failed to update {self._key}")
+                await asyncio.sleep(interval)
+        finally:
+            # Hand the view over without waiting for the lease to run out
+            try:
+                await self._redis.eval(
+                    RELEASE_LOCK_SCRIPT, 1, self._lease_key, self._token
+                )
+            except Exception:
+                logger.exception(f"Failed to release the lease on {self._key}")
+
+    async def wait_until_built(self, interval=None):
+        # For processes that read the view while another one maintains it
+        interval = interval or self.sync_interval
+        while not self.ready:
+            try:
+                await self._check_built()
+            except Exception:
+                logger.exception(f"Failed to check {self._key}")
+            if not self.ready:
+                await asyncio.sleep(interval)
@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+from aiohttp import web
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+
+async def metrics_handler(request):
+    return web.Response(
+        body=generate_latest(REGISTRY), headers={"Content-Type": CONTENT_TYPE_LATEST}
+    )
+
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests served.", ("method", "path", "status")
+)
+HTTP_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "path")
+)
+EVENT_LOOP_LAG = Gauge(
+    "event_loop_lag_seconds", "Delay of the last event loop lag probe."
+)
+EVENT_LOOP_LAG_HISTOGRAM = Histogram(
+    "event_loop_lag_probe_seconds", "Delays of event loop lag probes."
+)
+
+# How often to probe the event loop for lag
+LAG_PROBE_INTERVAL = 1
+
+# First port workers serve /metrics on when several share the API port
+DEFAULT_METRICS_PORT = 9464
+
+
+async def serve_metrics(port):
+    # /metrics on a listener of its own; returns its runner to clean up
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", int(port)).start()
+    return runner
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    # Label by route rather than raw path to keep cardinality bounded
+    route = request.match_info.route.resource
+    path = route.canonical if route is not None else "unmatched"
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        HTTP_DURATION.labels(method=request.method, path=path).observe(
+            time.perf_counter() - start
+        )
+        HTTP_REQUESTS.labels(method=request.method, path=path, status=status).inc()
+
+
+async def monitor_event_loop(interval=LAG_PROBE_INTERVAL):
+    # A sleep that wakes up late means callbacks are blocking the loop
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - start - interval, 0)
+        EVENT_LOOP_LAG.set(lag)
+        EVENT_LOOP_LAG_HISTOGRAM.observe(lag)
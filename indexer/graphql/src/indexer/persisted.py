@@ -0,0 +1,77 @@
+import hashlib
+from collections import OrderedDict
+
+from aiohttp import web
+
+# How long a registered query is kept in Redis since it was last registered
+PERSISTED_QUERY_TTL = 7 * 24 * 3600
+
+# Registered queries kept in process, in front of Redis
+LOCAL_PERSISTED_QUERIES = 1000
+
+PERSISTED_QUERY_VERSION = 1
+
+
+class PersistedQueryError(Exception):
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+class PersistedQueries:
+    """Automatic persisted queries (APQ) registered by SHA-256 hash.
+
+    Clients first send only the hash of a query; when it is unknown they
+    retry with the full text, which registers it. Registered queries are
+    shared between workers through Redis.
+    """
+
+    def __init__(
+        self, redis, ttl=PERSISTED_QUERY_TTL, local_size=LOCAL_PERSISTED_QUERIES
+    ):
+        self._redis = redis
+        self._ttl = ttl
+        self._local_size = local_size
+        self._local = OrderedDict()
+
+    def _remember(self, digest, query):
+        self._local[digest] = query
+        self._local.move_to_end(digest)
+        if len(self._local) > self._local_size:
+            self._local.popitem(last=False)
+
+    async def resolve(self, query, extensions):
+        # The query text to execute for a request's `query` and `extensions`
+        persisted = (extensions or {}).get("persistedQuery")
+        if persisted is None:
+            return query
+
+        if persisted.get("version") != PERSISTED_QUERY_VERSION:
+            raise PersistedQueryError(
+                "PersistedQueryNotSupported", "PERSISTED_QUERY_NOT_SUPPORTED"
+            )
+        digest = persisted.get("sha256Hash")
+        if not isinstance(digest, str):
+            raise web.HTTPBadRequest(reason="Missing persisted query hash")
+
+        if query is not None:
+            if hashlib.sha256(query.encode()).hexdigest() != digest:
+                raise web.HTTPBadRequest(reason="Provided sha does not match query")
+            await self._redis.set(f"apq:{digest}", query, ex=self._ttl)
+            self._remember(digest, query)
+            return query
+
+        query = self._local.get(digest)
+        if query is not None:
+            self._local.move_to_end(digest)
+            return query
+
+        stored = await self._redis.get(f"apq:{digest}")
+        if stored is None:
+            raise PersistedQueryError(
+                "PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND"
+            )
+        query = stored.decode()
+        self._remember(digest, query)
+        return query
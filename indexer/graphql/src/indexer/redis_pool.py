@@ -0,0 +1,94 @@
+import time
+
+import aioredis
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Connections each process may open to Redis; commands beyond it wait
+DEFAULT_REDIS_POOL_SIZE = 64
+
+# Seconds a command waits for a free connection before failing
+DEFAULT_REDIS_POOL_TIMEOUT = 5
+
+# Socket timeouts in seconds, for commands and for connecting
+DEFAULT_REDIS_TIMEOUT = 5
+DEFAULT_REDIS_CONNECT_TIMEOUT = 2
+
+# Seconds a connection may sit idle before it is checked with a PING
+DEFAULT_REDIS_HEALTH_CHECK_INTERVAL = 30
+
+# Latency buckets in seconds, finer than the defaults as waits are short
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+REDIS_POOL_SIZE = Gauge("redis_pool_size", "Redis connections allowed.")
+REDIS_POOL_OPEN = Gauge("redis_pool_open", "Redis connections open.")
+REDIS_POOL_IN_USE = Gauge("redis_pool_in_use", "Redis connections in use.")
+REDIS_POOL_WAIT = Histogram(
+    "redis_pool_wait_seconds",
+    "Time spent getting a Redis connection, connecting included.",
+    buckets=POOL_WAIT_BUCKETS,
+)
+REDIS_POOL_ERRORS = Counter(
+    "redis_pool_errors_total",
+    "Redis connections that could not be had in time or could not connect.",
+)
+
+
+class InstrumentedConnectionPool(aioredis.BlockingConnectionPool):
+    """Bounded Redis connection pool reporting its usage on /metrics.
+
+    Unlike the default pool, which opens a connection for every concurrent
+    command, bursts beyond `max_connections` wait up to `timeout` seconds
+    for a free one, and that wait is what `redis_pool_wait_seconds` shows.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        REDIS_POOL_SIZE.set(self.max_connections)
+
+    def _report(self):
+        # The queue holds idle connections and placeholders for unopened ones
+        REDIS_POOL_IN_USE.set(self.max_connections - self.pool.qsize())
+        REDIS_POOL_OPEN.set(len(self._connections))
+
+    async def get_connection(self, command_name, *keys, **options):
+        start = time.perf_counter()
+        try:
+            return await super().get_connection(command_name, *keys, **options)
+        except BaseException:
+            REDIS_POOL_ERRORS.inc()
+            raise
+        finally:
+            REDIS_POOL_WAIT.observe(time.perf_counter() - start)
+            self._report()
+
+    async def release(self, connection):
+        await super().release(connection)
+        self._report()
+
+
+def connect_redis(
+    url,
+    pool_size=DEFAULT_REDIS_POOL_SIZE,
+    pool_timeout=DEFAULT_REDIS_POOL_TIMEOUT,
+    timeout=DEFAULT_REDIS_TIMEOUT,
+    connect_timeout=DEFAULT_REDIS_CONNECT_TIMEOUT,
+    keepalive=True,
+    health_check_interval=DEFAULT_REDIS_HEALTH_CHECK_INTERVAL,
+):
+    """Redis client over an `InstrumentedConnectionPool`.
+
+    Options given in `url`, such as `?socket_timeout=1`, take precedence.
+    """
+    pool = InstrumentedConnectionPool.from_url(
+        url,
+        max_connections=pool_size,
+        timeout=pool_timeout,
+        socket_timeout=timeout,
+        socket_connect_timeout=connect_timeout,
+        socket_keepalive=keepalive,
+        health_check_interval=health_check_interval,
+        # Timeouts under load are worth one retry on a fresh connection
+        retry_on_timeout=True,
+    )
+    return aioredis.Redis(connection_pool=pool)
@@ -1,6 +1,9 @@
 from datetime import datetime
+import base64
 import hashlib
 
+from bson import json_util
+
 
 def str_to_felt(text):
     b_text = bytes(text, "ascii")
@@ -57,3 +60,35 @@ def create_uid(num1, num2, num3):
     hex_dig = hash_object.hexdigest()
 
     return hex_dig
+
+
+def encode_cursor(value, _id):
+    # Opaque cursor holding the sort key value and the document _id
+    payload = json_util.dumps([value, _id])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        value, _id = json_util.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("invalid cursor")
+    return value, _id
+
+
+def get_keyset_filter(sort_var, sort_dir, value, _id):
+    # Documents strictly after (value, _id) in (sort_var, _id) order
+    op = "$gt" if sort_dir == 1 else "$lt"
+    if value is None:
+        # Nulls sort first, so ascending pages continue into any non-null value
+        after_value = {"$ne": None} if sort_dir == 1 else None
+    else:
+        after_value = {op: value}
+    branches = [{sort_var: value, "_id": {op: _id}}]
+    if after_value is not None:
+        branches.insert(0, {sort_var: after_value})
+    if sort_dir == -1 and value is not None:
+        # Nulls and missing values sort last when descending, so they follow
+        # any non-null value
+        branches.append({sort_var: None})
+    return {"$or": branches}
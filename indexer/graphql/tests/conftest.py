@@ -0,0 +1,80 @@
+from collections import Counter
+
+import fakeredis
+import fakeredis.aioredis
+import mongomock
+import mongomock.aggregate
+import pytest
+import strawberry
+
+from indexer import db as db_module
+from indexer.cache import QueryCache
+from indexer.graphql import MAX_DOCUMENT_LIMIT, Query
+from indexer.loaders import Loaders
+
+
+def set_window_fields(in_collection, database, options):
+    # mongomock lacks $setWindowFields; number documents within a partition
+    # with $documentNumber, the only window the loaders use
+    [(name, window)] = options["output"].items()
+    assert window == {"$documentNumber": {}}
+    partition = options["partitionBy"]
+    assert partition.startswith("$")
+
+    numbers = Counter()
+    docs = []
+    sort_by = options["sortBy"]
+    for doc in mongomock.aggregate._handle_sort_stage(in_collection, database, sort_by):
+        key = repr(doc.get(partition[1:]))
+        numbers[key] += 1
+        docs.append({**doc, name: numbers[key]})
+    return docs
+
+
+@pytest.fixture(autouse=True)
+def window_fields(monkeypatch):
+    handlers = mongomock.aggregate._PIPELINE_HANDLERS
+    monkeypatch.setitem(handlers, "$setWindowFields", set_window_fields)
+
+
+@pytest.fixture
+def mongo():
+    return mongomock.MongoClient()["mongo"]
+
+
+@pytest.fixture
+async def db(mongo, monkeypatch):
+    # Created in the test's event loop, which its semaphore binds to
+    monkeypatch.setattr(db_module, "MongoClient", lambda *args, **kwargs: mongo.client)
+    database = db_module.AsyncDatabase("mongodb://test", "mongo", pool_size=4)
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def redis():
+    # A server of its own, as clients with the same address share one
+    return fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+
+
+@pytest.fixture
+def schema():
+    return strawberry.Schema(query=Query)
+
+
+@pytest.fixture
+def context(db, redis):
+    # Request context as IndexerGraphQLView builds it
+    def make_context(cache=None, **kwargs):
+        return {
+            "db": db,
+            "redis": redis,
+            "cache": (cache or QueryCache(redis)).batched(),
+            "loaders": Loaders(db),
+            "rank_index": None,
+            "counters": None,
+            "max_limit": MAX_DOCUMENT_LIMIT,
+            **kwargs,
+        }
+
+    return make_context
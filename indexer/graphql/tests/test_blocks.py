@@ -0,0 +1,80 @@
+from indexer import blocks
+from indexer.blocks import BlockTracker
+from indexer.cache import JSONCodec, QueryCache
+
+
+def insert_block(mongo, collection, block):
+    return mongo[collection].insert_one({"_cursor": {"from": block, "to": None}})
+
+
+async def versions(tracker, collections):
+    await tracker.poll()
+    return tracker.version(collections)
+
+
+async def test_versions_follow_indexed_blocks(db, mongo):
+    tracker = BlockTracker(db, collections=["adventurers", "battles"])
+    assert tracker.version(["adventurers"]) is None
+
+    both = ["adventurers", "battles"]
+    empty = await versions(tracker, both)
+    insert_block(mongo, "adventurers", 7)
+    seven = await versions(tracker, both)
+    assert seven != empty
+    assert seven.startswith("7-") and seven.endswith(".0")
+    assert await versions(tracker, both) == seven
+
+    insert_block(mongo, "battles", 9)
+    assert await versions(tracker, both) != seven
+    assert await versions(tracker, ["adventurers"]) == seven.split(".")[0]
+
+
+async def test_rewrites_at_the_same_height_change_the_version(db, mongo):
+    tracker = BlockTracker(db, collections=["adventurers"])
+    insert_block(mongo, "adventurers", 6)
+    pending = insert_block(mongo, "adventurers", 7).inserted_id
+    before = await versions(tracker, ["adventurers"])
+
+    # The pending block is written again
+    mongo.adventurers.delete_one({"_id": pending})
+    pending = insert_block(mongo, "adventurers", 7).inserted_id
+    rewritten = await versions(tracker, ["adventurers"])
+    assert rewritten != before
+
+    # A reorg drops the block and lands another at the same height
+    mongo.adventurers.delete_one({"_id": pending})
+    assert await versions(tracker, ["adventurers"]) not in (before, rewritten)
+    insert_block(mongo, "adventurers", 7)
+    assert await versions(tracker, ["adventurers"]) not in (before, rewritten)
+
+
+async def test_outdated_heights_version_nothing(db, mongo, monkeypatch):
+    tracker = BlockTracker(db, collections=["adventurers"])
+    await tracker.poll()
+    monkeypatch.setattr(blocks, "MAX_HEIGHT_AGE", -1)
+    assert tracker.version(["adventurers"]) is None
+
+
+async def test_new_blocks_invalidate_cached_results(db, mongo, redis):
+    tracker = BlockTracker(db, collections=["adventurers", "battles"])
+    cache = QueryCache(redis, blocks=tracker)
+    insert_block(mongo, "adventurers", 1)
+    await tracker.poll()
+
+    async def get(result):
+        async def compute():
+            return result
+
+        return await cache.get_or_compute(
+            "t:1", compute, JSONCodec(), collections=["adventurers"]
+        )
+
+    assert await get(1) == 1
+    # Blocks of other collections leave the entry in place
+    insert_block(mongo, "battles", 2)
+    await tracker.poll()
+    assert await get(2) == 1
+
+    insert_block(mongo, "adventurers", 3)
+    await tracker.poll()
+    assert await get(3) == 3
@@ -0,0 +1,242 @@
+import asyncio
+import time
+
+import pytest
+
+from indexer.cache import MISSING, JSONCodec, LocalCache, QueryCache
+
+
+class Computation:
+    # Counts calls, and blocks them until released when given an event
+    def __init__(self, result, release=None):
+        self.result = result
+        self.release = release
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+async def test_concurrent_misses_compute_once(redis):
+    cache = QueryCache(redis)
+    compute = Computation({"n": 1}, release=asyncio.Event())
+
+    callers = [
+        asyncio.create_task(cache.get_or_compute("t:1", compute, JSONCodec()))
+        for _ in range(5)
+    ]
+    await asyncio.sleep(0.05)
+    compute.release.set()
+
+    assert await asyncio.gather(*callers) == [{"n": 1}] * 5
+    assert compute.calls == 1
+
+
+async def test_errors_reach_followers_and_are_not_cached(redis):
+    cache = QueryCache(redis)
+    failing = Computation(ValueError("boom"), release=asyncio.Event())
+
+    callers = [
+        asyncio.create_task(cache.get_or_compute("t:1", failing, JSONCodec()))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0.05)
+    failing.release.set()
+
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert failing.calls == 1
+    assert await redis.keys("*") == []
+
+    assert await cache.get_or_compute("t:1", Computation(2), JSONCodec()) == 2
+
+
+async def test_follower_takes_over_cancelled_computation(redis):
+    cache = QueryCache(redis)
+    abandoned = Computation({"n": 0}, release=asyncio.Event())
+    takeover = Computation({"n": 1})
+
+    leader = asyncio.create_task(cache.get_or_compute("t:1", abandoned, JSONCodec()))
+    await asyncio.sleep(0.05)
+    followers = [
+        asyncio.create_task(cache.get_or_compute("t:1", takeover, JSONCodec()))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0.05)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+    assert await asyncio.gather(*followers) == [{"n": 1}] * 3
+    # One follower took over, the others followed it
+    assert takeover.calls == 1
+    assert await redis.keys("lock:*") == []
+
+
+async def test_replicas_wait_for_the_lock_holder(redis):
+    # Two caches over one Redis stand in for two replicas
+    first, second = QueryCache(redis), QueryCache(redis)
+    slow = Computation({"n": 1}, release=asyncio.Event())
+    other = Computation({"n": 2})
+
+    holder = asyncio.create_task(first.get_or_compute("t:1", slow, JSONCodec()))
+    await asyncio.sleep(0.05)
+    waiter = asyncio.create_task(second.get_or_compute("t:1", other, JSONCodec()))
+    await asyncio.sleep(0.05)
+    slow.release.set()
+
+    assert await holder == {"n": 1}
+    assert await waiter == {"n": 1}
+    assert other.calls == 0
+
+
+async def refreshed(cache):
+    # Waits for the background refreshes scheduled so far
+    await asyncio.gather(*cache._refreshes)
+
+
+async def test_stale_entries_are_served_while_they_refresh(redis):
+    cache = QueryCache(redis, stale_ttl=300)
+    assert await cache.get_or_compute("t:1", Computation(1), JSONCodec(), ex=60) == 1
+    # Past its fresh minute, into the stale window
+    await redis.expire("t:1", 200)
+
+    refresh = Computation(2, release=asyncio.Event())
+    assert await cache.get_or_compute("t:1", refresh, JSONCodec(), ex=60) == 1
+    # Stale hits during the refresh neither wait for it nor start another
+    assert await cache.get_or_compute("t:1", refresh, JSONCodec(), ex=60) == 1
+    refresh.release.set()
+    await refreshed(cache)
+    assert refresh.calls == 1
+
+    assert await cache.get_or_compute("t:1", Computation(3), JSONCodec(), ex=60) == 2
+    assert await redis.ttl("t:1") > 300
+
+
+async def test_failed_refresh_keeps_serving_the_stale_entry(redis):
+    cache = QueryCache(redis, stale_ttl=300)
+    await cache.get_or_compute("t:1", Computation(1), JSONCodec(), ex=60)
+    await redis.expire("t:1", 200)
+
+    failing = Computation(ValueError("boom"))
+    assert await cache.get_or_compute("t:1", failing, JSONCodec(), ex=60) == 1
+    await refreshed(cache)
+    assert failing.calls == 1
+
+    assert await cache.get_or_compute("t:1", failing, JSONCodec(), ex=60) == 1
+    await refreshed(cache)
+    assert failing.calls == 2
+    assert await redis.keys("lock:*") == []
+
+
+def test_local_cache_evicts_least_recently_used():
+    local = LocalCache(max_entries=2, max_bytes=100)
+    later = time.time() + 60
+    local.set("a", 1, 10, later)
+    local.set("b", 2, 10, later)
+    assert local.get("a") == 1
+    local.set("c", 3, 10, later)
+    assert local.get("b") is MISSING
+    assert (local.get("a"), local.get("c")) == (1, 3)
+
+    # Bytes bound it too, and entries larger than the bound are not kept
+    local.set("d", 4, 95, later)
+    assert (local.get("a"), local.get("c"), local.get("d")) == (MISSING, MISSING, 4)
+    local.set("e", 5, 101, later)
+    assert local.get("e") is MISSING
+
+
+def test_local_cache_entries_expire():
+    local = LocalCache()
+    local.set("a", 1, 10, time.time() - 1)
+    assert local.get("a") is MISSING
+
+
+async def test_fresh_results_are_served_in_process(redis):
+    cache = QueryCache(redis, local=LocalCache()).batched()
+    result = await cache.get_or_compute("t:1", Computation([1, 2]), JSONCodec())
+    trips = cache.round_trips
+
+    # The very same object, with no round-trip
+    assert await cache.get_or_compute("t:1", Computation(None), JSONCodec()) is result
+    assert cache.round_trips == trips
+
+
+async def test_local_cache_skips_stale_entries_and_excluded_namespaces(redis):
+    await QueryCache(redis).get_or_compute("t:1", Computation(1), JSONCodec(), ex=60)
+    await redis.expire("t:1", 200)
+
+    cache = QueryCache(redis, stale_ttl=300, local=LocalCache()).batched()
+    assert await cache.get_or_compute("t:1", Computation(2), JSONCodec(), ex=60) == 1
+    await refreshed(cache)
+    # The stale copy was not kept, so the refreshed entry is read
+    assert await cache.get_or_compute("t:1", Computation(3), JSONCodec(), ex=60) == 2
+
+    key = "discoveries_and_battles:1"
+    await cache.get_or_compute(key, Computation(1), JSONCodec())
+    trips = cache.round_trips
+    await cache.get_or_compute(key, Computation(1), JSONCodec())
+    assert cache.round_trips == trips + 1
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    # Commands of each pipeline the caches send
+    pipelines = []
+    execute = QueryCache._execute
+
+    async def spy(self, pipe):
+        pipelines.append([args[0] for args, _ in pipe.command_stack])
+        return await execute(self, pipe)
+
+    monkeypatch.setattr(QueryCache, "_execute", spy)
+    return pipelines
+
+
+async def test_warm_lookups_of_a_request_share_one_round_trip(redis, sent):
+    warm = QueryCache(redis)
+    for n in range(3):
+        await warm.get_or_compute(f"t:{n}", Computation(n), JSONCodec())
+
+    cache = warm.batched()
+    results = await asyncio.gather(
+        *(
+            cache.get_or_compute(f"t:{n}", Computation(None), JSONCodec())
+            for n in range(3)
+        )
+    )
+    assert results == [0, 1, 2]
+    assert cache.round_trips == 1
+    assert sent[-1] == ["GET", "PTTL"] * 3
+
+
+async def test_misses_write_with_their_ttl_and_release_in_one_round_trip(redis, sent):
+    cache = QueryCache(redis).batched()
+    await cache.get_or_compute("t:1", Computation(1), JSONCodec())
+
+    assert sent == [["GET", "PTTL"], ["SET"], ["SET", "EVAL"]]
+    assert cache.round_trips == 3
+
+
+async def test_unchanged_refreshes_only_extend_the_ttl(redis, sent):
+    cache = QueryCache(redis, stale_ttl=300)
+    await cache.get_or_compute("t:1", Computation(1), JSONCodec(), ex=60)
+    await redis.expire("t:1", 200)
+
+    sent.clear()
+    await cache.get_or_compute("t:1", Computation(1), JSONCodec(), ex=60)
+    await refreshed(cache)
+    assert sent[-1][0] == "EXPIRE"
+    assert await redis.ttl("t:1") > 300
+
+    await redis.expire("t:1", 200)
+    sent.clear()
+    await cache.get_or_compute("t:1", Computation(2), JSONCodec(), ex=60)
+    await refreshed(cache)
+    assert sent[-1][0] == "SET"
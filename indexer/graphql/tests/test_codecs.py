@@ -0,0 +1,106 @@
+import zlib
+from typing import Optional
+
+import pytest
+import strawberry
+
+from indexer import cache as cache_module
+from indexer.cache import (
+    COMPRESSION_NONE,
+    COMPRESSION_ZLIB,
+    COMPRESSION_ZSTD,
+    SERIALIZER_JSON,
+    SERIALIZER_MSGPACK,
+    CodecError,
+    IntCodec,
+    JSONCodec,
+    ObjectListCodec,
+    QueryCache,
+    deserialize,
+    serialize,
+)
+from indexer.graphql import Score
+
+LARGE = {"rows": [{"n": n, "name": f"adventurer {n}"} for n in range(200)]}
+
+
+@pytest.fixture(params=["binary", "json"])
+def backend(request, monkeypatch):
+    # The JSON and zlib fallback stands in when msgpack and zstandard are absent
+    if request.param == "json":
+        monkeypatch.setattr(cache_module, "msgpack", None)
+        monkeypatch.setattr(cache_module, "zstandard", None)
+    return request.param
+
+
+@strawberry.type
+class Checked:
+    n: Optional[int]
+    double: Optional[int] = None
+
+    def __post_init__(self):
+        self.double = self.n * 2
+
+    @classmethod
+    def from_mongo(cls, data):
+        return cls(n=data.get("n"))
+
+
+@pytest.mark.parametrize("value", [0, 42, "text", [1, None], {"a": [True]}, LARGE])
+def test_values_round_trip(backend, value):
+    assert JSONCodec().decode(JSONCodec().encode(value)) == value
+
+
+def test_ints_round_trip(backend):
+    assert IntCodec().decode(IntCodec().encode(7)) == 7
+
+
+def test_headers_record_the_format(backend):
+    small, large = serialize([1]), serialize(LARGE)
+    serializer = SERIALIZER_MSGPACK if backend == "binary" else SERIALIZER_JSON
+    compression = COMPRESSION_ZSTD if backend == "binary" else COMPRESSION_ZLIB
+
+    assert tuple(small[1:3]) == (serializer, COMPRESSION_NONE)
+    assert tuple(large[1:3]) == (serializer, compression)
+
+
+def test_objects_round_trip(backend):
+    codec = ObjectListCodec(Score)
+    scores = [Score(adventurerId=1, timestamp="2024", totalPayout=None)] * 2
+    assert codec.decode(codec.encode(scores)) == scores
+
+    codec = ObjectListCodec(Checked)
+    checked = codec.decode(codec.encode([Checked(n=2)]))
+    assert (checked[0].n, checked[0].double) == (2, 4)
+
+
+def test_rows_of_other_fields_go_through_from_mongo(backend):
+    payload = serialize([["adventurerId", "totalPayout"], [[3, 10]]])
+    [score] = ObjectListCodec(Score).decode(payload)
+    assert score == Score(adventurerId=3, timestamp=None, totalPayout=10)
+
+
+def test_json_payloads_are_read_by_the_binary_backend():
+    # Entries written by a worker without msgpack stay readable
+    payload = bytes((serialize(0)[0], SERIALIZER_JSON, COMPRESSION_ZLIB))
+    assert deserialize(payload + zlib.compress(b"[1]")) == [1]
+
+
+def test_unreadable_payloads_raise_codec_error(monkeypatch):
+    binary = serialize(LARGE)
+    monkeypatch.setattr(cache_module, "msgpack", None)
+    monkeypatch.setattr(cache_module, "zstandard", None)
+
+    for payload in (binary, b"\x00\x00\x00[]", b""):
+        with pytest.raises(CodecError):
+            deserialize(payload)
+
+
+async def test_unreadable_entries_are_recomputed(redis):
+    await redis.set("t:1", b"\x09unknown", ex=600)
+
+    async def compute():
+        return 1
+
+    assert await QueryCache(redis).get_or_compute("t:1", compute, JSONCodec()) == 1
+    assert deserialize(await redis.get("t:1")) == 1
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from indexer import db as db_module
+
+
+@pytest.fixture
+async def single_slot_db(mongo, monkeypatch):
+    monkeypatch.setattr(db_module, "MongoClient", lambda *args, **kwargs: mongo.client)
+    database = db_module.AsyncDatabase("mongodb://test", "mongo", pool_size=1)
+    yield database
+    database.close()
+
+
+async def test_find_matches_pymongo(db, mongo):
+    mongo.items.insert_many([{"n": n, "even": n % 2 == 0} for n in range(10)])
+
+    found = await db["items"].find(
+        {"even": True}, {"_id": 0}, sort=[("n", -1)], skip=1, limit=2
+    )
+    assert found == [{"n": 6, "even": True}, {"n": 4, "even": True}]
+    assert await db["items"].count_documents({"even": True}) == 5
+
+
+async def test_queries_never_exceed_the_pool(db):
+    running, peak = [], []
+    lock = threading.Lock()
+
+    def query():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.pop()
+
+    await asyncio.gather(*(db.run(query) for _ in range(20)))
+    assert max(peak) <= db.pool_size
+    assert db.in_use == 0
+
+
+async def test_timed_out_query_keeps_its_slot_until_it_returns(single_slot_db):
+    finished = threading.Event()
+
+    with pytest.raises(asyncio.TimeoutError):
+        await single_slot_db.run(lambda: finished.wait(5), timeout=0.01)
+    # The thread is still running, so the slot is still taken
+    assert single_slot_db.in_use == 1
+
+    waiting = asyncio.create_task(single_slot_db.run(lambda: "next"))
+    await asyncio.sleep(0.05)
+    assert not waiting.done()
+
+    finished.set()
+    assert await waiting == "next"
+    assert single_slot_db.in_use == 0
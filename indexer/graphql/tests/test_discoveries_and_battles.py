@@ -0,0 +1,62 @@
+import pytest
+
+QUERY = """
+query Page($skip: Int!, $limit: Int!) {
+    discoveriesAndBattles(skip: $skip, limit: $limit) {
+        type
+        data {
+            ... on Discovery { adventurerHealth }
+            ... on Battle { adventurerHealth }
+        }
+    }
+}
+"""
+
+# Days of each source's events, with ties within and across the sources
+DISCOVERY_DAYS = [5, 3, 3, 8, 1, 5, 7]
+BATTLE_DAYS = [3, 6, 5, 2, 8, 8]
+
+
+def insert_events(mongo, collection, days, offset):
+    # adventurerHealth tells the events apart
+    for i, day in enumerate(days):
+        mongo[collection].insert_one(
+            {
+                "adventurerHealth": offset + i,
+                "timestamp": f"2024-01-{day:02d}T00:00:00",
+                "_cursor": {"to": None},
+            }
+        )
+
+
+def concatenated(mongo, skip, limit):
+    # The page as merged before: both sources in full, sorted together
+    sources = [("Discovery", mongo.discoveries), ("Battle", mongo.battles)]
+    combined = sorted(
+        [
+            (kind, doc)
+            for kind, collection in sources
+            for doc in collection.find({}, sort=[("timestamp", -1)])
+        ],
+        key=lambda item: item[1]["timestamp"],
+        reverse=True,
+    )
+    return [
+        {"type": kind, "data": {"adventurerHealth": doc["adventurerHealth"]}}
+        for kind, doc in combined[skip : skip + limit]
+    ]
+
+
+@pytest.mark.parametrize("battle_days", [BATTLE_DAYS, []])
+@pytest.mark.parametrize("skip,limit", [(0, 3), (2, 5), (4, 4), (9, 10), (20, 5)])
+async def test_pages_match_sorting_both_sources(
+    schema, context, mongo, battle_days, skip, limit
+):
+    insert_events(mongo, "discoveries", DISCOVERY_DAYS, 100)
+    insert_events(mongo, "battles", battle_days, 200)
+
+    result = await schema.execute(
+        QUERY, variable_values={"skip": skip, "limit": limit}, context_value=context()
+    )
+    assert result.errors is None
+    assert result.data["discoveriesAndBattles"] == concatenated(mongo, skip, limit)
@@ -0,0 +1,64 @@
+from collections import Counter
+
+import pytest
+import strawberry
+from strawberry.schema import execute
+
+from indexer.documents import DocumentCache
+from indexer.graphql import Query
+
+QUERY = "query Total { countTotalAdventurers }"
+OTHER = "query Alive { countAliveAdventurers }"
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    # Times strawberry parsed and validated a document
+    counts = Counter()
+    for name in ("parse_document", "validate_document"):
+
+        def counted(*args, _name=name, _original=getattr(execute, name), **kwargs):
+            counts[_name] += 1
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(execute, name, counted)
+    return counts
+
+
+def make_schema(**kwargs):
+    return strawberry.Schema(query=Query, extensions=[DocumentCache(**kwargs)])
+
+
+async def run(schema, context, *queries):
+    return [await schema.execute(query, context_value=context()) for query in queries]
+
+
+async def test_repeated_queries_are_parsed_and_validated_once(context, calls):
+    results = await run(make_schema(), context, QUERY, QUERY, QUERY)
+
+    assert [result.data for result in results] == [{"countTotalAdventurers": 0}] * 3
+    assert calls == {"parse_document": 1, "validate_document": 1}
+
+
+async def test_validation_errors_are_reused(context, calls):
+    results = await run(make_schema(), context, "{ noSuchField }", "{ noSuchField }")
+
+    messages = [[error.message for error in result.errors] for result in results]
+    assert messages[0] and messages[0] == messages[1]
+    assert calls["validate_document"] == 1
+
+
+async def test_syntax_errors_are_not_cached(context, calls):
+    results = await run(make_schema(), context, "{", "{")
+
+    assert all(result.errors for result in results)
+    assert calls["parse_document"] == 2
+
+
+async def test_cache_is_bounded(context, calls):
+    await run(make_schema(maxsize=1), context, QUERY, OTHER, QUERY)
+    assert calls["parse_document"] == 3
+
+    calls.clear()
+    await run(make_schema(max_bytes=len(QUERY) - 1), context, QUERY, QUERY)
+    assert calls["parse_document"] == 2
@@ -0,0 +1,57 @@
+import pytest
+
+from indexer.graphql import (
+    ItemFilter,
+    ItemsFilter,
+    SlotFilter,
+    get_items_filter,
+    parse_item,
+)
+
+BASE = {"_cursor.to": None}
+
+
+def test_enum_names_compile_to_ids():
+    where = ItemsFilter(
+        item=ItemFilter(_in=[parse_item("Katana"), parse_item("Wand")]),
+        slot=SlotFilter(eq=1),
+    )
+    assert get_items_filter(where) == {
+        **BASE,
+        "item": {"$in": [42, 12]},
+        "slot": {"$eq": 1},
+    }
+
+
+def test_unknown_enum_names_compile_to_none():
+    # Rather than dropping the operator and matching every item
+    where = ItemsFilter(item=ItemFilter(_in=[parse_item("Nope")]))
+    assert get_items_filter(where) == {**BASE, "item": {"$in": [None]}}
+
+
+@pytest.fixture
+def items(mongo):
+    mongo.items.insert_many(
+        [
+            {"adventurerId": 1, "item": 42, "slot": 1, "_cursor": {"to": None}},
+            {"adventurerId": 1, "item": 12, "slot": 1, "_cursor": {"to": None}},
+            {"adventurerId": 1, "item": 2, "slot": 5, "_cursor": {"to": None}},
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "where, expected",
+    [
+        ('{item: {eq: "Katana"}}', ["Katana"]),
+        ('{item: {In: ["Katana", "Wand"]}}', ["Wand", "Katana"]),
+        ('{item: {notIn: "Katana"}, slot: {eq: "Weapon"}}', ["Wand"]),
+        ('{item: {eq: "Nope"}}', []),
+        ('{item: {In: ["Nope"]}}', []),
+    ],
+)
+async def test_enum_filters_reach_mongo(schema, context, items, where, expected):
+    query = "{ items(where: %s, orderBy: {item: {asc: true}}) { item } }" % where
+    result = await schema.execute(query, context_value=context())
+    assert result.errors is None
+    assert [item["item"] for item in result.data["items"]] == expected
@@ -0,0 +1,159 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+import pytest
+import strawberry
+from aiohttp import test_utils, web
+
+from indexer import handler
+from indexer.blocks import BlockTracker
+from indexer.cache import QueryCache
+from indexer.documents import DocumentCache
+from indexer.graphql import IndexerGraphQLView, Query
+from indexer.persisted import PersistedQueries
+
+QUERY = "query Total { countTotalAdventurers }"
+DIGEST = hashlib.sha256(QUERY.encode()).hexdigest()
+
+
+def persisted(digest=DIGEST):
+    return {"persistedQuery": {"version": 1, "sha256Hash": digest}}
+
+
+@pytest.fixture
+async def blocks(db, mongo):
+    mongo.adventurers.insert_one({"_cursor": {"from": 1, "to": None}})
+    tracker = BlockTracker(db)
+    await tracker.poll()
+    return tracker
+
+
+@pytest.fixture
+async def client(db, redis, blocks):
+    # The /graphql routes as run_graphql_api sets them up
+    view = IndexerGraphQLView(
+        db,
+        redis,
+        None,
+        QueryCache(redis, blocks=blocks),
+        persisted_queries=PersistedQueries(redis),
+        blocks=blocks,
+        schema=strawberry.Schema(query=Query, extensions=[DocumentCache()]),
+    )
+    app = web.Application()
+    app.router.add_route("POST", "/graphql", view)
+    app.router.add_route("GET", "/graphql", view)
+
+    client = test_utils.TestClient(test_utils.TestServer(app))
+    await client.start_server()
+    yield client
+    await client.close()
+
+
+async def test_persisted_query_miss_then_hit(client, redis):
+    miss = await client.post("/graphql", json={"extensions": persisted()})
+    [error] = (await miss.json())["errors"]
+    assert error["extensions"]["code"] == "PERSISTED_QUERY_NOT_FOUND"
+
+    registered = await client.post(
+        "/graphql", json={"query": QUERY, "extensions": persisted()}
+    )
+    assert (await registered.json())["data"] == {"countTotalAdventurers": 1}
+
+    hit = await client.post("/graphql", json={"extensions": persisted()})
+    assert (await hit.json())["data"] == {"countTotalAdventurers": 1}
+    hit = await client.get("/graphql", params={"extensions": json.dumps(persisted())})
+    assert (await hit.json())["data"] == {"countTotalAdventurers": 1}
+
+    # Other workers find it in Redis
+    assert await PersistedQueries(redis).resolve(None, persisted()) == QUERY
+
+
+async def test_persisted_query_must_match_its_hash(client):
+    response = await client.post(
+        "/graphql", json={"query": QUERY, "extensions": persisted("0" * 64)}
+    )
+    assert response.status == 400
+
+
+async def test_unsupported_persisted_query_version(client):
+    extensions = {"persistedQuery": {"version": 2, "sha256Hash": DIGEST}}
+    response = await client.post("/graphql", json={"extensions": extensions})
+    [error] = (await response.json())["errors"]
+    assert error["extensions"]["code"] == "PERSISTED_QUERY_NOT_SUPPORTED"
+
+
+async def test_matching_etag_is_answered_304(client, db, mongo):
+    response = await client.get("/graphql", params={"query": QUERY})
+    assert (await response.json())["data"] == {"countTotalAdventurers": 1}
+    assert response.headers["Cache-Control"] == "public, max-age=30"
+    etag = response.headers["ETag"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}'):
+        response = await client.get(
+            "/graphql",
+            params={"query": QUERY},
+            headers={"If-None-Match": if_none_match},
+        )
+        assert response.status == 304
+        assert response.headers["ETag"] == etag
+        assert await response.read() == b""
+
+
+async def test_wildcard_etag_is_not_a_match(client, db, mongo):
+    response = await client.get(
+        "/graphql", params={"query": QUERY}, headers={"If-None-Match": "*"}
+    )
+    assert response.status == 200
+    assert (await response.json())["data"] == {"countTotalAdventurers": 1}
+
+
+def test_max_ages_keep_a_bounded_number_of_hashes(monkeypatch):
+    parsed = []
+    parse_max_age = handler.parse_max_age
+    monkeypatch.setattr(handler, "DOCUMENT_CACHE_SIZE", 2)
+    monkeypatch.setattr(handler, "max_ages", OrderedDict())
+    monkeypatch.setattr(
+        handler,
+        "parse_max_age",
+        lambda *args: parsed.append(args) or parse_max_age(*args),
+    )
+
+    padding = " " * 10_000
+    queries = [f"{{ {field} }}{padding}" for field in ("a", "countTotalAdventurers")]
+    assert handler.get_max_age(queries[0], None) == 2
+    assert handler.get_max_age(queries[1], None) == 30
+    assert handler.get_max_age(queries[0], None) == 2
+    assert handler.get_max_age(queries[0], "Other") is None
+    assert len(parsed) == 3
+
+    assert len(handler.max_ages) == 2
+    assert all(len(key) == 16 for key in handler.max_ages)
+    # The least recently used entry went first
+    assert handler.get_max_age(queries[1], None) == 30
+    assert len(parsed) == 4
+
+
+async def test_new_blocks_change_the_etag(client, blocks, mongo):
+    response = await client.get("/graphql", params={"query": QUERY})
+    etag = response.headers["ETag"]
+
+    mongo.adventurers.insert_one({"_cursor": {"from": 2, "to": None}})
+    await blocks.poll()
+    response = await client.get(
+        "/graphql", params={"query": QUERY}, headers={"If-None-Match": etag}
+    )
+    assert response.status == 200
+    assert (await response.json())["data"] == {"countTotalAdventurers": 2}
+    assert response.headers["ETag"] != etag
+
+
+async def test_only_successful_get_queries_are_cacheable(client):
+    response = await client.post("/graphql", json={"query": QUERY})
+    assert "Cache-Control" not in response.headers
+
+    response = await client.get("/graphql", params={"query": "{ noSuchField }"})
+    assert (await response.json())["errors"]
+    assert "Cache-Control" not in response.headers
+    assert "ETag" not in response.headers
@@ -0,0 +1,82 @@
+from indexer.indexes import DEFAULT_SORT, covers, plan_indexes, shape_to_index
+
+CURRENT = {"_cursor.to": None}
+
+
+def test_shape_follows_equality_sort_range():
+    filter = {**CURRENT, "health": {"$gt": 0}, "owner": {"$eq": "0x1"}}
+    assert shape_to_index("adventurers", filter, [("xp", -1)]) == (
+        (("_cursor.to", 1), ("owner", 1), ("xp", -1), ("health", 1)),
+        2,
+    )
+
+
+def test_shape_keeps_first_position_of_repeated_fields():
+    filter = {
+        "$and": [
+            {**CURRENT, "adventurerId": {"$eq": 1}},
+            {"adventurerId": {"$in": [1, 2]}, "timestamp": {"$lt": 5}},
+        ]
+    }
+    sort = [("adventurerId", -1), ("timestamp", -1)]
+    assert shape_to_index("battles", filter, sort) == (
+        (("_cursor.to", 1), ("adventurerId", 1), ("timestamp", -1)),
+        2,
+    )
+
+
+def test_shape_looks_past_or_branches():
+    # Keyset pagination wraps the cursor in an $or no index prefix serves
+    filter = {**CURRENT, "$or": [{"xp": {"$lt": 5}}, {"xp": 5, "_id": {"$lt": 1}}]}
+    assert shape_to_index("adventurers", filter, [("xp", -1), ("_id", -1)]) == (
+        (("_cursor.to", 1), ("xp", -1), ("_id", -1)),
+        1,
+    )
+
+
+def test_shape_with_unknown_fields_is_skipped():
+    assert shape_to_index("adventurers", {"nope": {"$eq": 1}}, None) is None
+    assert shape_to_index("adventurers", CURRENT, [("nope", 1)]) is None
+    # updated_at is the default sort, though no input exposes it
+    assert shape_to_index("adventurers", CURRENT, DEFAULT_SORT)
+
+
+def test_covers_equality_fields_in_any_order_and_direction():
+    required = (("adventurerId", 1), ("owner", 1), ("xp", -1))
+    assert covers((("owner", -1), ("adventurerId", 1), ("xp", -1)), required, 2)
+    assert not covers((("owner", 1), ("xp", -1), ("adventurerId", 1)), required, 2)
+
+
+def test_covers_prefix_scanned_forwards_or_in_reverse():
+    required = (("_cursor.to", 1), ("xp", -1), ("_id", -1))
+    assert covers(required, required, 1)
+    assert covers((("_cursor.to", 1), ("xp", 1), ("_id", 1)), required, 1)
+    assert covers(required + (("health", 1),), required, 1)
+    # Only the whole suffix may be reversed
+    assert not covers((("_cursor.to", 1), ("xp", 1), ("_id", -1)), required, 1)
+    assert not covers(required[:2], required, 1)
+
+
+def test_plan_skips_shapes_served_by_wider_indexes(mongo):
+    mongo.scores.create_index(
+        [("_cursor.to", 1), ("adventurerId", 1), ("updated_at", 1), ("_id", 1)]
+    )
+
+    plan = plan_indexes(mongo)
+    assert "scores" in plan
+    # The reversed live index serves the adventurerId shape, but not the
+    # unfiltered one, whose sort must directly follow _cursor.to
+    assert plan["scores"] == [
+        ((("_cursor.to", 1), ("updated_at", -1), ("_id", -1)), "baseline")
+    ]
+
+
+def test_plan_adds_frequently_observed_shapes(mongo):
+    command = {"find": "scores", "filter": {**CURRENT, "timestamp": {"$gt": 0}}}
+    mongo["system.profile"].insert_many(
+        [{"ns": "mongo.scores", "ts": ts, "command": command} for ts in range(3)]
+    )
+
+    keys = (("_cursor.to", 1), ("timestamp", 1))
+    assert (keys, "observed 3 times") in plan_indexes(mongo)["scores"]
+    assert keys not in [k for k, _ in plan_indexes(mongo, min_observed=4)["scores"]]
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+import strawberry
+from prometheus_client import CollectorRegistry
+
+from indexer import db as db_module
+from indexer.graphql import Query
+from indexer.instrumentation import GraphQLMetrics, QueryInstrumentation
+
+EXPLAIN = {
+    "queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}},
+    "executionStats": {"nReturned": 1, "totalDocsExamined": 3},
+}
+
+
+@pytest.fixture
+def registry():
+    return CollectorRegistry()
+
+
+@pytest.fixture
+def instrumented_context(context, mongo, monkeypatch, registry):
+    def make_context(**kwargs):
+        instrumentation = QueryInstrumentation(registry=registry, **kwargs)
+        database = db_module.AsyncDatabase(
+            "mongodb://test", "mongo", instrumentation=instrumentation
+        )
+        databases.append(database)
+        return context(db=database), instrumentation
+
+    databases = []
+    monkeypatch.setattr(db_module, "MongoClient", lambda *args, **kwargs: mongo.client)
+    yield make_context
+    for database in databases:
+        database.close()
+
+
+@pytest.fixture
+def metrics_schema():
+    return strawberry.Schema(query=Query, extensions=[GraphQLMetrics])
+
+
+@pytest.fixture
+def collections(mongo):
+    current = {"_cursor": {"to": None}}
+    mongo.adventurers.insert_many([{"id": n, **current} for n in range(3)])
+    mongo.beasts.insert_one({"beast": 1, **current})
+
+
+async def test_queries_are_attributed_to_their_resolver(
+    metrics_schema, instrumented_context, registry, collections
+):
+    context, _ = instrumented_context(explain_sample_rate=0)
+    result = await metrics_schema.execute(
+        "{ adventurers { id } beasts { beast } }", context_value=context
+    )
+    assert result.errors is None
+
+    def sample(name, resolver, **labels):
+        labels = {"resolver": resolver, "collection": resolver, **labels}
+        return registry.get_sample_value(name, labels)
+
+    count = "mongo_query_duration_seconds_count"
+    assert sample(count, "adventurers", operation="find") == 1
+    assert sample(count, "beasts", operation="find") == 1
+    assert sample("mongo_query_duration_seconds_sum", "adventurers", operation="find")
+    assert sample("mongo_documents_returned_total", "adventurers") == 3
+    assert sample("mongo_documents_returned_total", "beasts") == 1
+    assert sample("mongo_slow_queries_total", "adventurers") is None
+
+
+async def test_slow_and_explained_queries(
+    metrics_schema, instrumented_context, registry, collections, mongo, monkeypatch
+):
+    commands = []
+
+    def command(self, spec):
+        commands.append(spec)
+        return EXPLAIN
+
+    monkeypatch.setattr(type(mongo), "command", command)
+    context, instrumentation = instrumented_context(
+        slow_query_ms=0, explain_sample_rate=1
+    )
+    result = await metrics_schema.execute("{ beasts { beast } }", context_value=context)
+    assert result.errors is None
+    while instrumentation._explains:
+        await asyncio.sleep(0)
+
+    labels = {"resolver": "beasts", "collection": "beasts"}
+    assert registry.get_sample_value("mongo_slow_queries_total", labels) == 1
+    assert registry.get_sample_value("mongo_explained_queries_total", labels) == 1
+    assert (
+        registry.get_sample_value("mongo_explain_documents_examined_total", labels) == 3
+    )
+    assert (
+        registry.get_sample_value("mongo_explain_documents_returned_total", labels) == 1
+    )
+    assert registry.get_sample_value("mongo_explain_collscans_total", labels) == 1
+    [spec] = commands
+    assert spec["explain"]["find"] == "beasts"
+    assert spec["verbosity"] == "executionStats"
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from indexer import db as db_module
+from indexer.loaders import Loaders
+
+
+@pytest.fixture
+def finds(monkeypatch):
+    # Filters of the finds sent to Mongo
+    calls = []
+    find = db_module.AsyncCollection.find
+
+    async def spy(self, filter, *args, **kwargs):
+        calls.append(filter)
+        return await find(self, filter, *args, **kwargs)
+
+    monkeypatch.setattr(db_module.AsyncCollection, "find", spy)
+    return calls
+
+
+@pytest.fixture
+def aggregates(monkeypatch):
+    # Pipelines sent to Mongo
+    calls = []
+    aggregate = db_module.AsyncCollection.aggregate
+
+    async def spy(self, pipeline, *args, **kwargs):
+        calls.append(pipeline)
+        return await aggregate(self, pipeline, *args, **kwargs)
+
+    monkeypatch.setattr(db_module.AsyncCollection, "aggregate", spy)
+    return calls
+
+
+@pytest.fixture
+def versions(mongo):
+    for id in range(1, 6):
+        # Two superseded versions and the current one of each adventurer
+        for block in range(3):
+            mongo.adventurers.insert_one(
+                {
+                    "id": id,
+                    "xp": block * 10 + id,
+                    "_cursor": {"from": block, "to": None if block == 2 else block + 1},
+                }
+            )
+        for item in range(4):
+            mongo.items.insert_one(
+                {"adventurerId": id, "item": item, "_cursor": {"from": 0, "to": None}}
+            )
+
+
+async def find_each(db, collection, field, filter, sort, skip, limit, projection):
+    # One aliased query per value, batched and run on their own
+    values = [3, 1, 5, 42]
+    collection = db[collection]
+
+    def alias(value):
+        return {**filter, field: {"$eq": value}}
+
+    loaders = Loaders(db)
+    batched = await asyncio.gather(
+        *(
+            loaders.find(collection, alias(v), projection, sort, skip, limit)
+            for v in values
+        )
+    )
+    alone = [
+        await collection.find(alias(v), projection, sort=sort, skip=skip, limit=limit)
+        for v in values
+    ]
+    return batched, alone
+
+
+@pytest.mark.parametrize(
+    "collection,field,filter,sort,skip,limit",
+    [
+        ("adventurers", "id", {"_cursor.to": None}, [("xp", -1)], 0, 1),
+        ("adventurers", "id", {"_cursor.to": None}, [("xp", -1)], 1, 1),
+        ("adventurers", "id", {}, [("xp", -1)], 1, 1),
+        ("adventurers", "id", {}, [("xp", 1)], 0, 0),
+        ("items", "adventurerId", {"_cursor.to": None}, [("item", 1)], 1, 2),
+        ("items", "adventurerId", {"_cursor.to": None}, [("item", -1)], 0, 0),
+        ("items", "adventurerId", {"_cursor.to": None}, [("item", -1)], 3, 5),
+        ("items", "adventurerId", {}, [], 0, 3),
+    ],
+)
+async def test_batched_results_match_each_alias(
+    db, versions, collection, field, filter, sort, skip, limit
+):
+    batched, alone = await find_each(
+        db, collection, field, filter, sort, skip, limit, {"_id": 0}
+    )
+    assert batched == alone
+    assert batched[-1] == []
+
+
+@pytest.mark.parametrize(
+    "projection", [None, {"_id": 0, "xp": 1}, {"_id": 0, "id": 0}, {"xp": 0}]
+)
+async def test_batched_results_keep_the_projection(db, versions, projection):
+    batched, alone = await find_each(
+        db, "adventurers", "id", {"_cursor.to": None}, [], 0, 0, projection
+    )
+    assert batched == alone
+
+
+async def test_current_unique_lookups_share_one_query(db, versions, finds):
+    await find_each(
+        db, "adventurers", "id", {"_cursor.to": None}, [("xp", 1)], 0, 1, None
+    )
+    # One $in query for the batch, then one find per alias run alone
+    assert [filter["id"] for filter in finds[:2]] == [
+        {"$in": [3, 1, 5, 42]},
+        {"$eq": 3},
+    ]
+    assert len(finds) == 5
+
+
+async def test_pages_by_other_fields_share_one_query(db, versions, finds, aggregates):
+    await find_each(
+        db, "items", "adventurerId", {"_cursor.to": None}, [("item", 1)], 1, 2, None
+    )
+    # One $in aggregation ranking each value's page, then the finds per
+    # alias run alone
+    [pipeline] = aggregates
+    assert pipeline[0]["$match"]["adventurerId"] == {"$in": [3, 1, 5, 42]}
+    assert pipeline[2]["$match"]["_rank"] == {"$gt": 1, "$lte": 3}
+    assert len(finds) == 4
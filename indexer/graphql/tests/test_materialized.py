@@ -0,0 +1,95 @@
+import asyncio
+
+from indexer.counters import AdventurerCounters
+from indexer.leaderboard import RankIndex
+
+
+async def test_readers_see_an_empty_build(db, mongo, redis):
+    # Nobody has died yet, so the rank index has no key at all
+    mongo.adventurers.insert_one(
+        {"id": 1, "xp": 5, "health": 10, "_cursor": {"from": 1, "to": None}}
+    )
+    await RankIndex(db, redis).build()
+    assert not await redis.exists(RankIndex.key)
+
+    reader = RankIndex(db, redis)
+    await asyncio.wait_for(reader.wait_until_built(interval=0.01), 1)
+    assert reader.ready
+
+
+async def test_readers_wait_for_a_compatible_build(db, redis):
+    await AdventurerCounters(db, redis).build()
+
+    class NextCounters(AdventurerCounters):
+        version = AdventurerCounters.version + 1
+
+    reader = NextCounters(db, redis)
+    waiting = asyncio.create_task(reader.wait_until_built(interval=0.01))
+    await asyncio.sleep(0.05)
+    assert not reader.ready
+
+    await NextCounters(db, redis).build()
+    await asyncio.wait_for(waiting, 1)
+    assert reader.ready
+
+
+def insert_adventurer(mongo, id, block, **fields):
+    mongo.adventurers.insert_one(
+        {"id": id, **fields, "_cursor": {"from": block, "to": None}}
+    )
+
+
+async def test_concurrent_builds_publish_a_whole_index(db, mongo, redis):
+    for id in range(1, 21):
+        insert_adventurer(mongo, id, 1, xp=id, health=0)
+
+    await asyncio.gather(*(RankIndex(db, redis).build() for _ in range(3)))
+    assert await redis.zcard(RankIndex.key) == 20
+    assert await redis.keys(f"{RankIndex.key}:build*") == []
+
+
+async def test_sync_skips_partial_versions(db, mongo, redis):
+    index = RankIndex(db, redis)
+    await index.build()
+
+    # A pending version without health, and a dead one without xp yet
+    insert_adventurer(mongo, 1, 5, xp=10)
+    insert_adventurer(mongo, 2, 5, health=0)
+    insert_adventurer(mongo, 3, 6, xp=30, health=0)
+    await index.sync()
+
+    assert await index.rank(20) == (2, 1)
+    assert index._last_block == 6
+
+
+async def stop(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def test_one_process_maintains_a_view(db, mongo, redis):
+    insert_adventurer(mongo, 1, 1, xp=5, health=0)
+    views = [RankIndex(db, redis) for _ in range(3)]
+    builds = [0] * len(views)
+    for i, view in enumerate(views):
+
+        async def build(i=i, build=view.build):
+            builds[i] += 1
+            await build()
+
+        view.build = build
+
+    tasks = [asyncio.create_task(view.run(interval=0.01)) for view in views]
+    await asyncio.sleep(0.1)
+    assert sorted(builds) == [0, 0, 1]
+    assert all(view.ready for view in views)
+
+    # Stopping the maintainer hands the view to one of the others
+    maintainer = builds.index(1)
+    await stop([tasks[maintainer]])
+    await asyncio.sleep(0.1)
+    assert sorted(builds) == [0, 1, 1]
+
+    await stop(tasks)
+    assert await redis.exists(f"{RankIndex.key}:maintainer") == 0
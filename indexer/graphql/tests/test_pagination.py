@@ -0,0 +1,78 @@
+import pytest
+
+from indexer.graphql import Score, paginate
+from indexer.utils import decode_cursor, encode_cursor, get_keyset_filter
+
+
+def insert_scores(mongo, payouts):
+    # One current score per payout; None leaves the field out altogether
+    for i, payout in enumerate(payouts):
+        doc = {"adventurerId": i, "timestamp": "2024", "_cursor": {"to": None}}
+        if payout is not None or i % 2:
+            doc["totalPayout"] = payout
+        mongo.scores.insert_one(doc)
+
+
+async def collect_pages(db, sort_dir, first):
+    ids, after = [], None
+    while True:
+        page = await paginate(
+            db["scores"],
+            {"_cursor.to": None},
+            "totalPayout",
+            sort_dir,
+            first,
+            after,
+            Score.from_mongo,
+        )
+        ids += [edge.node.adventurerId for edge in page.edges]
+        if not page.pageInfo.hasNextPage:
+            return ids
+        after = page.pageInfo.endCursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(5, "abc")
+    assert decode_cursor(cursor) == (5, "abc")
+
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor")
+
+
+def test_keyset_filter_descending_continues_into_nulls():
+    keyset = get_keyset_filter("xp", -1, 10, 3)
+    assert {"xp": None} in keyset["$or"]
+
+    # Ascending pages reach nulls first, so never continue into them
+    assert {"xp": None} not in get_keyset_filter("xp", 1, 10, 3)["$or"]
+
+
+@pytest.mark.parametrize("sort_dir", [1, -1])
+@pytest.mark.parametrize("first", [1, 2, 3])
+async def test_pages_cover_nulls_and_ties(db, mongo, sort_dir, first):
+    insert_scores(mongo, [3, None, 1, 3, None, 2, None, 1])
+
+    # Mongo orders nulls and missing values before any number
+    expected = [
+        doc["adventurerId"]
+        for doc in mongo.scores.find(
+            {}, sort=[("totalPayout", sort_dir), ("_id", sort_dir)]
+        )
+    ]
+
+    ids = await collect_pages(db, sort_dir, first)
+    assert ids == expected
+    assert sorted(ids) == list(range(8))
+
+
+@pytest.mark.parametrize("first", [0, -1])
+async def test_pages_must_hold_a_document(schema, context, mongo, first):
+    insert_scores(mongo, [1, 2, 3])
+    result = await schema.execute(
+        "query Page($first: Int) { scoresConnection(first: $first) "
+        "{ edges { node { adventurerId } } } }",
+        variable_values={"first": first},
+        context_value=context(),
+    )
+    assert result.data is None
+    assert [error.message for error in result.errors] == ["first must be at least 1"]
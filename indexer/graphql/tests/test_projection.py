@@ -0,0 +1,27 @@
+import pytest
+
+QUERIES = {
+    "repeated fields": "{ adventurers { id } adventurers { xp } }",
+    "fragments": """
+        { ...Ids ...Xp }
+        fragment Ids on Query { adventurers { id } }
+        fragment Xp on Query { adventurers { xp } }
+    """,
+    "connection fragments": """
+        { ...Ids ...Xp }
+        fragment Ids on Query { adventurersConnection { edges { node { id } } } }
+        fragment Xp on Query { adventurersConnection { edges { node { xp } } } }
+    """,
+}
+
+
+@pytest.mark.parametrize("query", QUERIES.values(), ids=QUERIES.keys())
+async def test_merged_selections_are_all_projected(schema, context, mongo, query):
+    mongo.adventurers.insert_one({"id": 1, "xp": 250, "_cursor": {"to": None}})
+
+    result = await schema.execute(query, context_value=context())
+    assert result.errors is None
+    [adventurers] = result.data.values()
+    if "edges" in adventurers:
+        adventurers = [edge["node"] for edge in adventurers["edges"]]
+    assert adventurers == [{"id": 1, "xp": 250}]
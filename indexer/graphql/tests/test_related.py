@@ -0,0 +1,51 @@
+import pytest
+
+from indexer import db as db_module
+
+CURRENT = {"_cursor": {"to": None}}
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    # (operation, collection) of each query sent to Mongo
+    calls = []
+    for name in ("find", "aggregate"):
+        method = getattr(db_module.AsyncCollection, name)
+
+        def spy(method, name):
+            async def query(self, *args, **kwargs):
+                calls.append((name, self.name))
+                return await method(self, *args, **kwargs)
+
+            return query
+
+        monkeypatch.setattr(db_module.AsyncCollection, name, spy(method, name))
+    return calls
+
+
+@pytest.fixture
+def adventurers(mongo):
+    for id in range(1, 21):
+        mongo.adventurers.insert_one({"id": id, **CURRENT})
+        mongo.items.insert_many(
+            [{"adventurerId": id, "item": item, **CURRENT} for item in range(1, 6)]
+        )
+
+
+async def test_related_lists_take_one_query_per_collection(
+    schema, context, adventurers, queries
+):
+    result = await schema.execute(
+        """{
+            adventurers(limit: 20, orderBy: {id: {asc: true}}) {
+                id
+                items(skip: 1, limit: 2, orderBy: {item: {desc: true}}) { item }
+            }
+        }""",
+        context_value=context(),
+    )
+    assert result.errors is None
+    assert len(result.data["adventurers"]) == 20
+    for adventurer in result.data["adventurers"]:
+        assert adventurer["items"] == [{"item": "Silver Ring"}, {"item": "Amulet"}]
+    assert queries == [("find", "adventurers"), ("aggregate", "items")]
@@ -0,0 +1,34 @@
+import os
+import re
+import signal
+
+import pytest
+
+from indexer import graphql
+
+
+def exit_at_once(kwargs):
+    # Stands in for a worker that cannot start
+    os._exit(3)
+
+
+def test_workers_failing_to_start_back_off_then_give_up(monkeypatch, caplog):
+    monkeypatch.setattr(graphql, "run_graphql_worker", exit_at_once)
+    monkeypatch.setattr(graphql, "WORKER_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(graphql, "WORKER_RESTART_DELAY", 0.01)
+    monkeypatch.setattr(graphql, "WORKER_MAX_STARTUP_FAILURES", 3)
+    # Leave the test process's own signal handlers alone
+    monkeypatch.setattr(signal, "signal", lambda *args: None)
+
+    with pytest.raises(SystemExit) as exit:
+        graphql.serve_graphql_api(workers=2, port="0")
+    assert exit.value.code == 1
+
+    delays = [
+        float(match.group(1))
+        for record in caplog.records
+        for match in [re.search(r"worker-0 exited .* in ([\d.]+)s", record.message)]
+        if match
+    ]
+    assert delays == [0.02, 0.04]
+    assert "failed to start 3 times in a row" in caplog.text
@@ -0,0 +1,127 @@
+"""Compare the binary cache codec with the previous JSON one.
+
+Run from the repository root with the GraphQL API's dependencies installed:
+
+    python scripts/bench_cache_codecs.py
+
+The binary codec uses msgpack and zstandard, which the API depends on;
+run it without them to measure the JSON and zlib fallback.
+"""
+
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "indexer", "graphql", "src")
+)
+
+from indexer import cache  # noqa: E402
+from indexer.cache import ObjectListCodec  # noqa: E402
+from indexer.graphql import (  # noqa: E402
+    Adventurer,
+    Battle,
+    Discovery,
+    DiscoveryOrBattle,
+    DiscoveryOrBattleCodec,
+)
+
+ROUNDS = 200
+
+
+class LegacyObjectListCodec:
+    # The JSON codec cached results used before
+    def __init__(self, cls):
+        self.cls = cls
+
+    def encode(self, items):
+        return json.dumps([item.__dict__ for item in items])
+
+    def decode(self, data):
+        return [self.cls.from_mongo(item) for item in json.loads(data)]
+
+
+class LegacyDiscoveryOrBattleCodec:
+    def encode(self, items):
+        return json.dumps(
+            [
+                {"type": item.type, "timestamp": item.timestamp, "data": item.data}
+                for item in items
+            ],
+            default=lambda obj: obj.__dict__,
+        )
+
+    def decode(self, data):
+        return [
+            DiscoveryOrBattle(
+                type=item["type"],
+                timestamp=item["timestamp"],
+                data=(
+                    Discovery.from_mongo(item["data"])
+                    if item["type"] == "Discovery"
+                    else Battle.from_mongo(item["data"])
+                ),
+            )
+            for item in json.loads(data)
+        ]
+
+
+def make_document(cls, i):
+    # Realistic mix of small ints, hex strings and timestamps
+    doc = {}
+    for name in cls.__annotations__:
+        value = random.choice(
+            [random.randint(0, 255), f"{random.getrandbits(160):040x}", None]
+        )
+        doc[name] = value
+    doc["timestamp"] = f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}"
+    return cls.from_mongo(doc)
+
+
+def make_page(n):
+    return [
+        DiscoveryOrBattle(
+            type="Discovery" if i % 2 else "Battle",
+            timestamp=f"2024-01-01T00:00:{i:02d}",
+            data=make_document(Discovery if i % 2 else Battle, i),
+        )
+        for i in range(n)
+    ]
+
+
+def bench(name, codec, value):
+    payload = codec.encode(value)
+    encode = timeit.timeit(lambda: codec.encode(value), number=ROUNDS) / ROUNDS
+    decode = timeit.timeit(lambda: codec.decode(payload), number=ROUNDS) / ROUNDS
+    print(
+        f"{name:<40} {len(payload):>9,} B"
+        f" {encode * 1e6:>10.0f} us {decode * 1e6:>10.0f} us"
+    )
+
+
+def main():
+    random.seed(1)
+    print(
+        f"serializer: {'msgpack' if cache.msgpack else 'json'}, "
+        f"compression: {'zstd' if cache.zstandard else 'zlib'}"
+    )
+    print(f"{'':<40} {'size':>11} {'encode':>13} {'decode':>13}")
+
+    for n in (10, 101):
+        adventurers = [make_document(Adventurer, i) for i in range(n)]
+        bench(
+            f"adventurers x{n} (json)", LegacyObjectListCodec(Adventurer), adventurers
+        )
+        bench(f"adventurers x{n} (binary)", ObjectListCodec(Adventurer), adventurers)
+
+        page = make_page(n)
+        bench(
+            f"discoveriesAndBattles x{n} (json)", LegacyDiscoveryOrBattleCodec(), page
+        )
+        bench(f"discoveriesAndBattles x{n} (binary)", DiscoveryOrBattleCodec(), page)
+
+
+if __name__ == "__main__":
+    main()